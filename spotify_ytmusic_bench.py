@@ -0,0 +1,419 @@
+"""
+Benchmark do pipeline Spotify → YouTube Music sem tocar nos serviços reais.
+
+Clientes falsos (em processo) substituem Spotify e YTMusic, com latência,
+taxa de erros transitórios e de 429 configuráveis, sobre uma biblioteca
+sintética de N faixas. O pipeline medido é o de verdade: stream_liked_songs
+(exportação paginada em paralelo) alimentando import_tracks_to_ytmusic
+(buscas, pontuação, lotes de adição).
+
+Uso:
+    python spotify_ytmusic_bench.py --sizes 100,1000,10000 --workers 1,4,8
+    python spotify_ytmusic_bench.py --sizes 100000 --yt-latency 0.05 --json
+
+Relata faixas/s, chamadas de API por faixa, pico de memória (tracemalloc) e
+p50/p99 por etapa: exportação (intervalo entre linhas), busca (por chamada),
+pontuação (por linha), adição (por lote) e ponta a ponta (da exportação até
+a decisão da linha).
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+import tracemalloc
+from contextlib import contextmanager
+
+import spotify_ytmusic_sync as app
+
+
+# -------------------------------------------------------------------
+# Serviços falsos
+# -------------------------------------------------------------------
+
+class FakeAPIError(Exception):
+    """Erro no formato que classify_api_error reconhece (http_status/headers)."""
+
+    def __init__(self, http_status: int, retry_after: float = None):
+        super().__init__(f"HTTP {http_status} (simulado)")
+        self.http_status = http_status
+        self.headers = {"Retry-After": str(retry_after)} if retry_after is not None else {}
+
+
+class FakeService:
+    """
+    Base dos clientes falsos: cada chamada dorme `latency` (± jitter) e pode
+    falhar com 503 (error_rate) ou 429 (throttle_rate). Conta chamadas e
+    guarda a duração de cada uma por endpoint.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.5, error_rate=0.0, throttle_rate=0.0, retry_after=0.05, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.calls = 0
+        self.timings = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _call(self, endpoint: str):
+        start = time.perf_counter()
+        with self._lock:
+            self.calls += 1
+            roll = self._random.random()
+            delay = self.latency * self._random.uniform(1 - self.jitter, 1 + self.jitter)
+        try:
+            if delay > 0:
+                time.sleep(delay)
+            if roll < self.throttle_rate:
+                raise FakeAPIError(429, self.retry_after)
+            if roll < self.throttle_rate + self.error_rate:
+                raise FakeAPIError(503)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.timings.setdefault(endpoint, []).append(elapsed)
+
+
+class FakeSpotify(FakeService):
+    """Curtidas e playlists paginadas por offset/limit, como a Web API."""
+
+    def __init__(self, library, **kwargs):
+        super().__init__(**kwargs)
+        self.items = [
+            {"added_at": f"2024-01-01T00:00:{i % 60:02d}Z", "track": track} for i, track in enumerate(library)
+        ]
+
+    def _page(self, offset: int, limit: int):
+        self._call("spotify")
+        items = self.items[offset:offset + limit]
+        next_offset = offset + limit if offset + limit < len(self.items) else None
+        return {
+            "items": items,
+            "total": len(self.items),
+            "limit": limit,
+            "offset": offset,
+            "next": None if next_offset is None else {"offset": next_offset, "limit": limit},
+        }
+
+    def current_user_saved_tracks(self, limit=20, offset=0, **kwargs):
+        return self._page(offset, limit)
+
+    def playlist_tracks(self, playlist_id, limit=100, offset=0, **kwargs):
+        return self._page(offset, limit)
+
+    def next(self, result):
+        return self._page(result["next"]["offset"], result["next"]["limit"]) if result["next"] else None
+
+
+class FakeYTMusic(FakeService):
+    """
+    Catálogo sintético: a consulta "artista título limpo" (ou só o título)
+    encontra a faixa; títulos com sufixos ("- Remastered") só aparecem nas
+    buscas alternativas. Cada resposta traz o acerto e alguns chamarizes.
+    """
+
+    def __init__(self, library, missing_ids=frozenset(), **kwargs):
+        super().__init__(**kwargs)
+        self.catalog = {}
+        for track in library:
+            if track["id"] in missing_ids:
+                continue
+            title = app.clean_track_title(track["name"])
+            result = {
+                "videoId": f"yt_{track['id']}",
+                "title": title,
+                "artists": [{"name": a["name"]} for a in track["artists"]],
+                "album": {"name": track["album"]["name"]},
+                "duration_seconds": track["duration_ms"] // 1000,
+            }
+            self.catalog[app.normalize_text(f"{track['artists'][0]['name']} {title}")] = result
+            self.catalog.setdefault(app.normalize_text(title), result)
+        self.playlists = {}
+
+    def create_playlist(self, title, description="", **kwargs):
+        self._call("create")
+        playlist_id = f"PL{len(self.playlists)}"
+        self.playlists[playlist_id] = []
+        return playlist_id
+
+    def search(self, query, filter=None, limit=20, **kwargs):
+        self._call("search")
+        hit = self.catalog.get(app.normalize_text(query))
+        decoys = [
+            {"videoId": f"decoy{i}_{abs(hash(query)) % 10**6}", "title": f"{query} (Karaoke Version)",
+             "artists": [{"name": "Karaoke Hits"}], "album": {"name": ""}, "duration_seconds": 180}
+            for i in range(2)
+        ]
+        return ([hit] if hit else []) + decoys
+
+    def add_playlist_items(self, playlist_id, video_ids, duplicates=False, **kwargs):
+        self._call("add")
+        self.playlists.setdefault(playlist_id, []).extend(video_ids)
+        return {"status": "STATUS_SUCCEEDED"}
+
+
+def synthetic_library(size: int, dup_ratio=0.05, variant_ratio=0.1, seed=0):
+    """
+    Gera `size` faixas no formato da Web API do Spotify. Uma fração repete
+    músicas anteriores (dup_ratio) e outra tem sufixos de remaster/feat.
+    (variant_ratio), que a busca completa não encontra.
+    """
+    rnd = random.Random(seed)
+    library = []
+    for i in range(size):
+        if library and rnd.random() < dup_ratio:
+            library.append(dict(rnd.choice(library), id=f"sp{i}"))
+            continue
+        name = f"Song {i} {rnd.choice(['Love', 'Night', 'Fire', 'Rain', 'Gold'])}"
+        if rnd.random() < variant_ratio:
+            name += rnd.choice([" - Remastered 2011", " (feat. Guest)", " - Radio Edit"])
+        library.append({
+            "id": f"sp{i}",
+            "name": name,
+            "artists": [{"name": f"Artist {i % max(size // 20, 1)}"}],
+            "album": {"name": f"Album {i // 12}"},
+            "duration_ms": rnd.randint(120_000, 360_000),
+            "external_ids": {"isrc": f"BENCH{i:07d}"},
+        })
+    return library
+
+
+# -------------------------------------------------------------------
+# Medição
+# -------------------------------------------------------------------
+
+def percentile(values, q: float):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def summarize(values) -> dict:
+    """p50/p99 em milissegundos."""
+    p50, p99 = percentile(values, 0.50), percentile(values, 0.99)
+    return {
+        "n": len(values),
+        "p50_ms": None if p50 is None else round(p50 * 1000, 3),
+        "p99_ms": None if p99 is None else round(p99 * 1000, 3),
+    }
+
+
+@contextmanager
+def patched(module, **attrs):
+    """Troca atributos do módulo durante o benchmark e restaura no final."""
+    old = {name: getattr(module, name) for name in attrs}
+    for name, value in attrs.items():
+        setattr(module, name, value)
+    try:
+        yield
+    finally:
+        for name, value in old.items():
+            setattr(module, name, value)
+
+
+def run_benchmark(
+    size: int,
+    workers: int = app.SEARCH_WORKERS_DEFAULT,
+    fan_out: int = app.SPOTIFY_FAN_OUT_DEFAULT,
+    batch_size: int = app.ADD_BATCH_SIZE_DEFAULT,
+    yt_latency: float = 0.0,
+    spotify_latency: float = 0.0,
+    error_rate: float = 0.0,
+    throttle_rate: float = 0.0,
+    missing_ratio: float = 0.05,
+    yt_rate: float = 1000.0,
+    use_cache: bool = True,
+    seed: int = 0,
+    profiles: int = 1,
+) -> dict:
+    """
+    Roda exportação + importação de uma biblioteca sintética de `size`
+    faixas contra os serviços falsos e devolve as métricas da execução.
+    yt_rate é o ritmo máximo (req/s) do controle adaptativo do YouTube Music;
+    o padrão alto mede o custo do próprio pipeline. Com profiles > 1, as
+    buscas são divididas (SearchPool) entre perfis falsos, cada um com o seu
+    controle de ritmo de yt_rate.
+    """
+    library = synthetic_library(size, seed=seed)
+    rnd = random.Random(seed)
+    missing = frozenset(t["id"] for t in library if rnd.random() < missing_ratio)
+    faults = dict(error_rate=error_rate, throttle_rate=throttle_rate, seed=seed)
+    sp = FakeSpotify(library, latency=spotify_latency, **faults)
+    yt = FakeYTMusic(library, missing, latency=yt_latency, **faults)
+
+    emitted_at = {}
+    stage = {"export": [], "match": [], "row": []}
+    last_emit = [None]
+
+    def timed_match(row, candidates):
+        start = time.perf_counter()
+        try:
+            return real_pick_best_match(row, candidates)
+        finally:
+            stage["match"].append(time.perf_counter() - start)
+
+    def rows_with_timing(stream):
+        for row in stream:
+            now = time.perf_counter()
+            if last_emit[0] is not None:
+                stage["export"].append(now - last_emit[0])
+            last_emit[0] = now
+            emitted_at[id(row)] = now
+            yield row
+
+    def on_row_done(row, video_id):
+        start = emitted_at.pop(id(row), None)
+        if start is not None:
+            stage["row"].append(time.perf_counter() - start)
+
+    real_pick_best_match = app.pick_best_match
+    # diretório temporário para o browser.json e o cache; apagado no fim de cada execução
+    with tempfile.TemporaryDirectory(prefix="ytbench_") as tmpdir:
+        headers_file = os.path.join(tmpdir, "browser.json")
+        with open(headers_file, "w", encoding="utf-8") as f:
+            f.write("{}")
+        cache = app.SearchCache(os.path.join(tmpdir, "search_cache.sqlite3")) if use_cache else None
+
+        # o controle adaptativo pode cortar o ritmo até 1/10 de yt_rate sob 429/erros
+        yt_limiter = app.AdaptiveRateLimiter(yt_rate, min_rate=max(app.YT_RATE_MIN, yt_rate / 10), max_rate=yt_rate)
+        sp_limiter = app.AdaptiveRateLimiter(yt_rate, min_rate=1.0, max_rate=yt_rate)
+        search_pool = None
+        if profiles > 1:
+            search_pool = app.SearchPool(
+                [("principal", yt, yt_limiter)]
+                + [
+                    (f"perfil{i}", yt, app.AdaptiveRateLimiter(yt_rate, min_rate=max(app.YT_RATE_MIN, yt_rate / 10), max_rate=yt_rate))
+                    for i in range(2, profiles + 1)
+                ]
+            )
+        progress = app.ImportProgress()
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        with patched(
+            app,
+            get_spotify_client=lambda: sp,
+            get_ytmusic=lambda headers: yt,
+            get_search_cache=lambda: cache,
+            pick_best_match=timed_match,
+        ):
+            stream = app.stream_liked_songs(lambda text: None, fan_out=fan_out, limiter=sp_limiter)
+            rows = rows_with_timing(stream)
+            playlist_id, not_found = app.import_tracks_to_ytmusic(
+                rows,
+                "bench",
+                headers_file,
+                0,
+                lambda text: None,
+                search_workers=workers,
+                add_batch_size=batch_size,
+                use_search_cache=use_cache,
+                on_row_done=on_row_done,
+                limiter=yt_limiter,
+                progress=progress,
+                search_pool=search_pool,
+            )
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        if cache:
+            cache._conn.close()
+
+    snapshot = progress.snapshot()
+    yt_limiters = [p.limiter for p in search_pool.profiles] if search_pool else [yt_limiter]
+    api_calls = sp.calls + yt.calls
+    return {
+        "size": size,
+        "workers": workers,
+        "profiles": profiles,
+        "fan_out": fan_out,
+        "batch_size": batch_size,
+        "seconds": round(elapsed, 3),
+        "tracks_per_s": round(size / elapsed, 1) if elapsed else None,
+        "api_calls": api_calls,
+        "calls_per_track": round(api_calls / size, 3) if size else None,
+        "spotify_calls": sp.calls,
+        "yt_searches": len(yt.timings.get("search", [])),
+        "yt_adds": len(yt.timings.get("add", [])),
+        "added": len(yt.playlists.get(playlist_id, [])),
+        "not_found": len(not_found),
+        "found": snapshot["found"],
+        "review": snapshot["review"],
+        "retries": sp_limiter.retries + sum(limiter.retries for limiter in yt_limiters),
+        "peak_mem_mb": round(peak / 1024 / 1024, 2),
+        "stages": {
+            "export": summarize(stage["export"]),
+            "search": summarize(yt.timings.get("search", [])),
+            "match": summarize(stage["match"]),
+            "add": summarize(yt.timings.get("add", [])),
+            "row": summarize(stage["row"]),
+        },
+    }
+
+
+def format_result(result: dict) -> str:
+    lines = [
+        f"N={result['size']:>7}  workers={result['workers']:<2}  perfis={result['profiles']}  "
+        f"{result['tracks_per_s']:>9} faixas/s  {result['calls_per_track']:.3f} chamadas/faixa  "
+        f"pico {result['peak_mem_mb']} MB  ({result['seconds']}s, "
+        f"{result['added']} adicionadas, {result['not_found']} não encontradas, {result['retries']} retentativas)"
+    ]
+    for name, stats in result["stages"].items():
+        if stats["n"]:
+            lines.append(f"    {name:<7} p50 {stats['p50_ms']:>9} ms   p99 {stats['p99_ms']:>9} ms   (n={stats['n']})")
+    return "\n".join(lines)
+
+
+def _int_list(value: str):
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark offline do pipeline Spotify → YouTube Music.")
+    parser.add_argument("--sizes", type=_int_list, default=[100, 1000], help="tamanhos das bibliotecas (ex.: 100,1000,100000)")
+    parser.add_argument("--workers", type=_int_list, default=[app.SEARCH_WORKERS_DEFAULT], help="buscas simultâneas a testar (ex.: 1,4,8)")
+    parser.add_argument("--fan-out", type=int, default=app.SPOTIFY_FAN_OUT_DEFAULT, help="páginas do Spotify em paralelo")
+    parser.add_argument("--batch-size", type=int, default=app.ADD_BATCH_SIZE_DEFAULT, help="faixas por lote ao adicionar")
+    parser.add_argument("--yt-latency", type=float, default=0.0, help="latência simulada do YT Music (s)")
+    parser.add_argument("--spotify-latency", type=float, default=0.0, help="latência simulada do Spotify (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fração de chamadas com erro 503")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="fração de chamadas com 429")
+    parser.add_argument("--missing-ratio", type=float, default=0.05, help="fração de faixas fora do catálogo do YT")
+    parser.add_argument("--yt-rate", type=float, default=1000.0, help="ritmo máximo (req/s) do controle adaptativo")
+    parser.add_argument("--profiles", type=_int_list, default=[1], help="perfis de busca a testar (ex.: 1,2,4)")
+    parser.add_argument("--no-cache", dest="cache", action="store_false", help="sem cache de buscas / índice global")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="uma linha JSON por execução")
+    args = parser.parse_args(argv)
+
+    for size in args.sizes:
+        for workers, profiles in [(w, p) for w in args.workers for p in args.profiles]:
+            result = run_benchmark(
+                size,
+                workers=workers,
+                fan_out=args.fan_out,
+                batch_size=args.batch_size,
+                yt_latency=args.yt_latency,
+                spotify_latency=args.spotify_latency,
+                error_rate=args.error_rate,
+                throttle_rate=args.throttle_rate,
+                missing_ratio=args.missing_ratio,
+                yt_rate=args.yt_rate,
+                use_cache=args.cache,
+                seed=args.seed,
+                profiles=profiles,
+            )
+            print(json.dumps(result) if args.json else format_result(result), flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,246 +1,3489 @@
+from __future__ import annotations
+
+import time
+
+_MODULE_STARTED_AT = time.perf_counter()  # referência do relatório de inicialização
+
 import os
+import re
+import sys
+import argparse
 import csv
-import time
+import json
+import importlib
+import random
+import hashlib
+import sqlite3
+import queue
 import threading
-import tkinter as tk
-from tkinter import ttk, messagebox, filedialog
+import unicodedata
+import logging
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import aclosing
+from functools import lru_cache, partial
+from itertools import chain
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from requests import Session
+    from spotipy import Spotify
+    from ytmusicapi import YTMusic
+
+# requests, spotipy, ytmusicapi, dotenv e asyncio são carregados só no
+# primeiro uso (lazy_import): a janela abre sem esperar por eles.
+
+# -------------------------------------------------------------------
+# Configuração inicial
+# -------------------------------------------------------------------
+
+CSV_DIR = "csv"  # criado sob demanda por quem grava nele, não ao importar o módulo
+
+# Tkinter só é importado quando a GUI abre (ver _import_tk); o modo CLI não precisa dele.
+tk = ttk = messagebox = filedialog = None
+
+HEADERS_FILE_DEFAULT = "browser.json"
+SEARCH_WORKERS_DEFAULT = 4
+HTTP_POOL_SIZE = 32  # conexões keep-alive por host, compartilhadas por todos os workers
+SPOTIFY_FAN_OUT_DEFAULT = 4
+# Maior página aceita por endpoint do Spotify (playlist: 100, curtidas: 50)
+SPOTIFY_PLAYLIST_PAGE_LIMIT = 100
+SPOTIFY_SAVED_PAGE_LIMIT = 50
+# Projeção `fields` das páginas de playlist: só o que vai para o CSV e para a
+# paginação (sem available_markets, imagens, URLs externas etc.)
+SPOTIFY_PLAYLIST_FIELDS = (
+    "total,limit,offset,next,"
+    "items(added_at,track(id,name,duration_ms,artists(name),album(name),external_ids(isrc)))"
+)
+ADD_BATCH_SIZE_DEFAULT = 50
+ADD_FLUSH_SECONDS_DEFAULT = 10.0
+# Linhas lidas à frente das buscas (fila entre o Spotify/CSV e o pool de busca)
+PIPELINE_QUEUE_SIZE = 256
+
+# Controle de ritmo adaptativo (requisições por segundo)
+YT_RATE_MIN = 0.2
+YT_RATE_MAX = 5.0
+SPOTIFY_RATE_DEFAULT = 10.0
+SPOTIFY_RATE_MAX = 20.0
+RATE_MAX_RETRIES = 4
+
+# Importação asyncio: threads compartilhadas para as chamadas bloqueantes
+ASYNC_IO_WORKERS = 32
+
+# Pool de perfis de busca: falhas seguidas até tirar um perfil do rodízio,
+# e por quanto tempo (dobra a cada nova ejeção)
+SEARCH_POOL_EJECT_AFTER = 3
+SEARCH_POOL_COOLDOWN = 60.0
+
+SYNC_STATE_DIR = os.path.join(CSV_DIR, "sync_state")
+
+# Log da GUI: a tela mostra só as últimas linhas; o log completo vai para o arquivo
+LOG_BUFFER_MAX_LINES = 10_000
+LOG_WIDGET_MAX_LINES = 5_000
+LOG_FILE = os.path.join(CSV_DIR, "app.log")
+LOG_FILE_MAX_BYTES = 5 * 1024 * 1024
+LOG_FILE_BACKUPS = 3
+
+# Busca manual: espera o usuário parar de digitar antes de buscar
+MANUAL_SEARCH_DEBOUNCE = 0.35
+MANUAL_SEARCH_MIN_CHARS = 3
+MANUAL_SEARCH_RESULTS = 20
+
+# Colunas do CSV exportado (CSVs antigos só com Artist,Track continuam válidos)
+CSV_COLUMNS = ["Artist", "Track", "Album", "DurationMs", "ISRC", "SpotifyId"]
+
+# Abaixo desta confiança a faixa vai para revisão em vez de ser adicionada
+MATCH_CONFIDENCE_DEFAULT = 0.6
+
+# Cascata de buscas tentada quando a consulta completa não dá um match confiável
+QUERY_VARIANTS = ("clean", "primary_artist", "ascii", "track_only")
+QUERY_VARIANTS_DEFAULT = QUERY_VARIANTS
+
+SEARCH_CACHE_FILE = os.path.join(CSV_DIR, "search_cache.sqlite3")
+SEARCH_CACHE_TTL_SECONDS = 30 * 24 * 3600  # 30 dias
+SEARCH_CACHE_MAX_ENTRIES = 100_000
+SEARCH_CACHE_TOP_N = 5
+SONG_KEY_VERSION = 2  # muda quando song_key passa a gerar chaves diferentes
+
+# Histogramas de tempo (segundos), no formato de buckets do Prometheus
+METRICS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+METRICS_PREFIX = "spotify_ytmusic"
+
+
+# -------------------------------------------------------------------
+# Helpers de concorrência
+# -------------------------------------------------------------------
+
+def classify_api_error(e: Exception):
+    """
+    Classifica uma exceção de API: "throttled" (429), "transient" (rede/5xx)
+    ou None (erro definitivo, não adianta repetir).
+    """
+    status = getattr(e, "http_status", None)
+    if status is None:
+        status = getattr(getattr(e, "response", None), "status_code", None)
+    text = str(e)
+    if status == 429 or "429" in text or "Too Many Requests" in text:
+        return "throttled"
+    if (status and status >= 500) or isinstance(e, OSError) or re.search(r"HTTP 5\d\d", text):
+        return "transient"
+    return None
+
+
+def _retry_after(e: Exception):
+    headers = getattr(e, "headers", None) or getattr(getattr(e, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+class RunMetrics:
+    """
+    Contadores e histogramas de tempo (thread-safe) de uma execução.
+    observe(nome, segundos) alimenta um histograma com os buckets de
+    METRICS_BUCKETS; inc(nome, n) soma num contador. Com `parent`, tudo o que
+    é registrado aqui também vai para ele (usado para acumular as execuções
+    no registro do processo, exposto no formato texto do Prometheus).
+    """
+
+    def __init__(self, parent: "RunMetrics" = None):
+        self.parent = parent
+        self.started_at = time.time()
+        self.counters = {}
+        self.histograms = {}  # nome -> [contagens por bucket (+Inf no fim), soma, mínimo, máximo]
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+        if self.parent:
+            self.parent.inc(name, value)
+
+    def count(self, name: str) -> float:
+        """Valor atual do contador `name` (0 se nunca foi incrementado)."""
+        with self._lock:
+            return self.counters.get(name, 0)
+
+    def observe(self, name: str, seconds: float):
+        index = next((i for i, bound in enumerate(METRICS_BUCKETS) if seconds <= bound), len(METRICS_BUCKETS))
+        with self._lock:
+            hist = self.histograms.get(name)
+            if hist is None:
+                hist = self.histograms[name] = [[0] * (len(METRICS_BUCKETS) + 1), 0.0, seconds, seconds]
+            hist[0][index] += 1
+            hist[1] += seconds
+            hist[2] = min(hist[2], seconds)
+            hist[3] = max(hist[3], seconds)
+        if self.parent:
+            self.parent.observe(name, seconds)
+
+    def timer(self, name: str):
+        """Context manager que observa o tempo do bloco em `name`."""
+        return _MetricsTimer(self, name)
+
+    @staticmethod
+    def _quantile(counts, total: int, q: float, maximum: float) -> float:
+        # limite superior do bucket onde cai o quantil (o máximo, no bucket +Inf)
+        rank = q * total
+        running = 0
+        for bound, count in zip(METRICS_BUCKETS, counts):
+            running += count
+            if running >= rank:
+                return min(bound, maximum)
+        return maximum
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            histograms = {}
+            for name, (counts, total_seconds, minimum, maximum) in sorted(self.histograms.items()):
+                count = sum(counts)
+                histograms[name] = {
+                    "count": count,
+                    "sum": round(total_seconds, 6),
+                    "min": round(minimum, 6),
+                    "max": round(maximum, 6),
+                    "p50": round(self._quantile(counts, count, 0.50, maximum), 6),
+                    "p90": round(self._quantile(counts, count, 0.90, maximum), 6),
+                    "p99": round(self._quantile(counts, count, 0.99, maximum), 6),
+                    "buckets": dict(zip([*map(str, METRICS_BUCKETS), "+Inf"], counts)),
+                }
+            counters = {k: round(v, 6) if isinstance(v, float) else v for k, v in sorted(self.counters.items())}
+        return {
+            "started_at": self.started_at,
+            "duration_seconds": round(time.time() - self.started_at, 3),
+            "counters": counters,
+            "histograms": histograms,
+        }
+
+    def write_json(self, path: str):
+        """Grava o snapshot num arquivo JSON (atomicamente)."""
+        tmp = f"{path}.tmp"
+        ensure_parent_dir(path)
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp, path)
+
+    def to_prometheus(self, prefix: str = METRICS_PREFIX) -> str:
+        """Formato texto de exposição do Prometheus (contadores e histogramas)."""
+        def metric_name(name, suffix):
+            return re.sub(r"[^a-zA-Z0-9_]", "_", f"{prefix}_{name}_{suffix}")
+
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = [(k, list(v[0]), v[1]) for k, v in sorted(self.histograms.items())]
+        lines = []
+        for name, value in counters:
+            metric = metric_name(name, "total")
+            lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+        for name, counts, total_seconds in histograms:
+            metric = metric_name(name, "seconds")
+            lines.append(f"# TYPE {metric} histogram")
+            running = 0
+            for bound, count in zip([*map(str, METRICS_BUCKETS), "+Inf"], counts):
+                running += count
+                lines.append(f'{metric}_bucket{{le="{bound}"}} {running}')
+            lines += [f"{metric}_sum {total_seconds}", f"{metric}_count {running}"]
+        return "\n".join(lines) + "\n"
+
+
+class _MetricsTimer:
+    def __init__(self, metrics: RunMetrics, name: str):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, time.perf_counter() - self._start)
+        return False
+
+
+# Registro do processo: acumula todas as execuções (endpoint do Prometheus)
+PROCESS_METRICS = RunMetrics()
+
+
+def serve_metrics(port: int, host: str = "127.0.0.1", metrics: RunMetrics = PROCESS_METRICS):
+    """
+    Sobe, numa thread daemon, um endpoint HTTP com as métricas no formato
+    texto do Prometheus (GET /metrics). Retorna o servidor.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") not in ("", "/metrics"):
+                self.send_error(404)
+                return
+            body = metrics.to_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class AdaptiveRateLimiter:
+    """
+    Controle de ritmo compartilhado entre threads (token bucket + AIMD).
+    Cada chamada bem-sucedida aumenta o ritmo um pouco (aumento aditivo);
+    um 429 ou falha transitória corta o ritmo pela metade (redução
+    multiplicativa) e espera com backoff exponencial + jitter antes de
+    repetir. Em 429 todos os workers pausam juntos.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        min_rate: float = YT_RATE_MIN,
+        max_rate: float = YT_RATE_MAX,
+        increase: float = 0.05,
+        decrease: float = 0.5,
+        max_retries: int = RATE_MAX_RETRIES,
+        base_backoff: float = 1.0,
+        max_backoff: float = 60.0,
+    ):
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.rate = min(max(rate, min_rate), max_rate)
+        self.increase = increase
+        self.decrease = decrease
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.calls = 0
+        self.retries = 0
+        self.throttled = 0
+        self.waited = 0.0  # segundos parados no controle de ritmo (espaçamento + backoff)
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+        self._paused_until = 0.0
+
+    @classmethod
+    def from_delay(cls, sleep_seconds: float, **kwargs):
+        """Cria a partir do antigo 'Delay (s)': intervalo inicial entre chamadas."""
+        max_rate = kwargs.get("max_rate", YT_RATE_MAX)
+        rate = 1.0 / sleep_seconds if sleep_seconds > 0 else max_rate
+        return cls(rate, **kwargs)
+
+    def _reserve(self, metrics: RunMetrics = None, service: str = None) -> float:
+        """Reserva a próxima vaga e devolve quanto esperar por ela."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot, self._paused_until)
+            self._next_slot = slot + 1.0 / self.rate
+            delay = slot - now
+            if delay > 0:
+                self.waited += delay
+        if delay > 0 and metrics is not None:
+            metrics.inc(f"{service}.throttle_wait_seconds", delay)
+        return delay
+
+    def acquire(self):
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    def next_slot(self) -> float:
+        """Instante (time.monotonic) em que a próxima chamada poderia sair."""
+        with self._lock:
+            return max(self._next_slot, self._paused_until)
+
+    def on_success(self):
+        with self._lock:
+            self.calls += 1
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_error(self, attempt: int, throttled: bool, retry_after: float = None) -> float:
+        """Reduz o ritmo e devolve quanto esperar antes da próxima tentativa."""
+        with self._lock:
+            self.retries += 1
+            if throttled:
+                self.throttled += 1
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            if retry_after:
+                # Retry-After é o mínimo pedido pelo servidor: jitter só para cima
+                backoff = retry_after * (1 + random.uniform(0, 0.5))
+            else:
+                backoff = min(self.max_backoff, self.base_backoff * 2 ** attempt) * random.uniform(0.5, 1.5)
+            if throttled:
+                self._paused_until = max(self._paused_until, time.monotonic() + backoff)
+        return backoff
+
+    def _retry_backoff(self, error: Exception, attempt: int, metrics: RunMetrics = None, service: str = None):
+        """Quanto esperar antes de repetir após `error`, ou None se não deve repetir."""
+        kind = classify_api_error(error)
+        if kind is None or attempt >= self.max_retries:
+            return None
+        throttled = kind == "throttled"
+        backoff = self.on_error(attempt, throttled, _retry_after(error))
+        if metrics is not None:
+            metrics.inc(f"{service}.retries")
+            if throttled:
+                metrics.inc(f"{service}.throttled")
+        if throttled:
+            return 0.0  # em 429 a pausa global já vale na próxima vaga
+        with self._lock:
+            self.waited += backoff
+        if metrics is not None:
+            metrics.inc(f"{service}.throttle_wait_seconds", backoff)
+        return backoff
+
+    def call(self, fn, *args, **kwargs):
+        """Executa fn respeitando o ritmo, repetindo em 429/falhas transitórias."""
+        return self._call(None, None, fn, args, kwargs)
+
+    async def acall(self, fn, *args, executor=None, **kwargs):
+        """
+        call() para asyncio: as esperas (ritmo e backoff) não ocupam thread;
+        só a chamada bloqueante fn roda no executor.
+        """
+        return await self._acall(None, None, fn, args, kwargs, executor)
+
+    def _call(self, metrics, service, fn, args, kwargs):
+        # com metrics, retentativas, 429 e espera vão para os contadores
+        # "<service>.*" da execução no momento em que acontecem (o limiter
+        # pode ser compartilhado; os contadores dele são do processo)
+        attempt = 0
+        while True:
+            delay = self._reserve(metrics, service)
+            if delay > 0:
+                time.sleep(delay)
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                backoff = self._retry_backoff(e, attempt, metrics, service)
+                if backoff is None:
+                    raise
+                time.sleep(backoff)
+                attempt += 1
+                continue
+            self.on_success()
+            return result
+
+    async def _acall(self, metrics, service, fn, args, kwargs, executor):
+        import asyncio  # já carregado: esta corrotina roda num loop
+        loop = asyncio.get_running_loop()
+        attempt = 0
+        while True:
+            delay = self._reserve(metrics, service)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                result = await loop.run_in_executor(executor, partial(fn, *args, **kwargs))
+            except Exception as e:
+                backoff = self._retry_backoff(e, attempt, metrics, service)
+                if backoff is None:
+                    raise
+                await asyncio.sleep(backoff)
+                attempt += 1
+                continue
+            self.on_success()
+            return result
+
+    @staticmethod
+    def _timed(metrics: RunMetrics, name: str, fn):
+        def attempt(*a, **k):
+            start = time.perf_counter()
+            try:
+                return fn(*a, **k)
+            except Exception:
+                metrics.inc(f"{name}.errors")
+                raise
+            finally:
+                metrics.observe(name, time.perf_counter() - start)
+
+        return attempt
+
+    def timed_call(self, metrics: RunMetrics, name: str, fn, *args, **kwargs):
+        """
+        call() medindo cada tentativa no histograma `name` de metrics (só o
+        tempo da chamada em si). Retentativas, 429 e a espera no controle de
+        ritmo vão para os contadores "<serviço>.retries", "<serviço>.throttled"
+        e "<serviço>.throttle_wait_seconds", com o serviço tirado de `name`
+        ("yt.search" -> "yt").
+        """
+        if metrics is None:
+            return self.call(fn, *args, **kwargs)
+        return self._call(metrics, name.split(".")[0], self._timed(metrics, name, fn), args, kwargs)
+
+    async def atimed_call(self, metrics: RunMetrics, name: str, fn, *args, executor=None, **kwargs):
+        """timed_call() para asyncio (ver acall)."""
+        if metrics is None:
+            return await self.acall(fn, *args, executor=executor, **kwargs)
+        return await self._acall(metrics, name.split(".")[0], self._timed(metrics, name, fn), args, kwargs, executor)
+
+    def stats(self) -> str:
+        return (
+            f"{self.rate:.2f} req/s, {self.calls} chamada(s), "
+            f"{self.retries} retentativa(s), {self.throttled} limite(s) 429"
+        )
+
+
+def _is_profile_error(error: Exception) -> bool:
+    """
+    Se o erro é do perfil (429, rede/5xx, sessão recusada) e não da consulta:
+    só esses contam para ejetar o perfil e justificam tentar em outro.
+    """
+    if classify_api_error(error):
+        return True
+    status = getattr(error, "http_status", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status in (401, 403) or bool(re.search(r"HTTP 40[13]\b", str(error)))
+
+
+class _SearchProfile:
+    def __init__(self, name: str, client, limiter: AdaptiveRateLimiter):
+        self.name = name
+        self.client = client
+        self.limiter = limiter
+        self.searches = 0
+        self.failures = 0  # falhas seguidas
+        self.ejections = 0
+        self.ejected_until = 0.0
+
+
+class SearchPool:
+    """
+    Distribui as buscas (só leitura) entre vários perfis do YT Music
+    (browser.json), cada um com o seu controle de ritmo; as escritas
+    continuam na conta dona da playlist. Cada busca vai para o perfil
+    saudável com a vaga mais próxima; se falhar (já depois das retentativas
+    do limiter) por limite, rede ou sessão recusada, é repetida em outro
+    perfil; erros da própria consulta sobem direto. Um perfil com
+    SEARCH_POOL_EJECT_AFTER falhas seguidas sai do rodízio por
+    SEARCH_POOL_COOLDOWN segundos (o dobro a cada nova ejeção) e volta em
+    teste; um sucesso zera a contagem. Se todos estiverem fora, usa o que
+    volta primeiro. Pode ser compartilhado entre importações simultâneas.
+    """
+
+    def __init__(
+        self,
+        profiles,
+        log=None,
+        eject_after: int = SEARCH_POOL_EJECT_AFTER,
+        cooldown: float = SEARCH_POOL_COOLDOWN,
+    ):
+        self.profiles = [_SearchProfile(name, client, limiter) for name, client, limiter in profiles]
+        if not self.profiles:
+            raise ValueError("SearchPool precisa de pelo menos um perfil.")
+        self.log = log
+        self.eject_after = eject_after
+        self.cooldown = cooldown
+        self.ejected = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_headers(cls, headers_file: str, limiter: AdaptiveRateLimiter, extra_headers, sleep_seconds: float, log=None):
+        """
+        Pool com a conta principal (mesmo cliente e limiter das escritas) e
+        um perfil por browser.json extra, com limiter próprio.
+        """
+        profiles = [(os.path.basename(headers_file), get_ytmusic(headers_file), limiter)]
+        for path in extra_headers:
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Perfil de busca '{path}' não encontrado.")
+            profiles.append((os.path.basename(path), get_ytmusic(path), AdaptiveRateLimiter.from_delay(sleep_seconds)))
+        return cls(profiles, log=log)
+
+    def _pick(self, tried):
+        now = time.monotonic()
+        with self._lock:
+            candidates = [p for p in self.profiles if p not in tried]
+            if not candidates:
+                return None
+            healthy = [p for p in candidates if p.ejected_until <= now]
+            if not healthy:
+                return min(candidates, key=lambda p: p.ejected_until)
+            # vaga mais próxima no controle de ritmo de cada perfil
+            return min(healthy, key=lambda p: (p.limiter.next_slot(), p.searches))
+
+    def _succeeded(self, profile: _SearchProfile):
+        with self._lock:
+            profile.searches += 1
+            profile.failures = 0
+            profile.ejections = 0
+            profile.ejected_until = 0.0
+
+    def _failed(self, profile: _SearchProfile, error) -> bool:
+        with self._lock:
+            profile.failures += 1
+            if profile.failures < self.eject_after:
+                return False
+            profile.failures = 0
+            profile.ejected_until = time.monotonic() + self.cooldown * 2 ** profile.ejections
+            profile.ejections += 1
+            self.ejected += 1
+            seconds = profile.ejected_until - time.monotonic()
+        if self.log:
+            self.log(f"  🚫 Perfil de busca '{profile.name}' fora do rodízio por {seconds:.0f}s: {error}")
+        return True
+
+    async def asearch(self, metrics: RunMetrics, query: str, executor=None, **kwargs):
+        """
+        Busca `query` no perfil escolhido por _pick, tentando os outros se
+        ele falhar por limite, rede ou sessão; kwargs vão para client.search.
+        A chamada roda em `executor` (ver AdaptiveRateLimiter.acall).
+        """
+        tried = set()
+        last_error = None
+        while True:
+            profile = self._pick(tried)
+            if profile is None:
+                raise last_error
+            try:
+                results = await profile.limiter.atimed_call(
+                    metrics, "yt.search", profile.client.search, query, executor=executor, **kwargs
+                )
+            except Exception as e:
+                if not _is_profile_error(e):
+                    raise
+                self._failed_attempt(profile, e, metrics)
+                tried.add(profile)
+                last_error = e
+                continue
+            self._succeeded(profile)
+            return results
+
+    def _failed_attempt(self, profile: _SearchProfile, error, metrics: RunMetrics):
+        if self._failed(profile, error) and metrics is not None:
+            metrics.inc("search_pool.ejections")
+
+    def stats(self) -> str:
+        with self._lock:
+            now = time.monotonic()
+            parts = [
+                f"{p.name}: {p.searches} busca(s), {p.limiter.rate:.2f} req/s"
+                + (" (fora do rodízio)" if p.ejected_until > now else "")
+                for p in self.profiles
+            ]
+        return "; ".join(parts)
+
+
+def ordered_map(fn, items, workers: int, window: int = None):
+    """
+    Aplica fn(item) em paralelo num pool de threads e devolve os resultados
+    na MESMA ordem de entrada. No máximo `window` tarefas ficam pendentes,
+    então `items` pode ser um gerador (não é materializado inteiro).
+    """
+    workers = max(1, int(workers))
+    window = window or workers * 2
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for item in items:
+            pending.append(pool.submit(fn, item))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+_io_executor = None
+_io_executor_lock = threading.Lock()
+
+
+def io_executor() -> ThreadPoolExecutor:
+    """
+    Pool de threads compartilhado pelas importações asyncio para as chamadas
+    bloqueantes dos clientes (ASYNC_IO_WORKERS threads no total, não importa
+    quantas importações estejam rodando).
+    """
+    global _io_executor
+    with _io_executor_lock:
+        if _io_executor is None:
+            _io_executor = ThreadPoolExecutor(max_workers=ASYNC_IO_WORKERS, thread_name_prefix="yt-io")
+        return _io_executor
+
+
+async def aprefetch(items, maxsize: int):
+    """
+    Consome `items` (iterável bloqueante, ex.: paginação do Spotify) numa
+    thread produtora e entrega os itens no loop asyncio, sem ocupar o
+    executor: o produtor anda na frente do consumidor, mas nunca mais que
+    maxsize itens. Exceções do produtor são relançadas no consumidor; se o
+    consumidor parar, o produtor para também.
+    """
+    import asyncio
+    loop = asyncio.get_running_loop()
+    buffer = asyncio.Queue()
+    slots = threading.Semaphore(max(1, maxsize))
+    stop = threading.Event()
+    end = object()
+
+    def put(entry) -> bool:
+        while not stop.is_set():
+            if slots.acquire(timeout=0.1):
+                try:
+                    loop.call_soon_threadsafe(buffer.put_nowait, entry)
+                except RuntimeError:  # loop já encerrado
+                    return False
+                return True
+        return False
+
+    def produce():
+        iterator = iter(items)
+        try:
+            for item in iterator:
+                if not put((item, None)):
+                    return
+            put((end, None))
+        except BaseException as e:
+            put((end, e))
+        finally:
+            close = getattr(iterator, "close", None)
+            if close and stop.is_set():
+                close()
+
+    threading.Thread(target=produce, daemon=True).start()
+    try:
+        while True:
+            item, error = await buffer.get()
+            slots.release()
+            if item is end:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
+
+
+async def aordered_map(fn, items, concurrency: int, window: int = None):
+    """
+    ordered_map() para asyncio: aplica a corrotina fn(item) a um async
+    iterável com no máximo `concurrency` execuções ao mesmo tempo (semáforo)
+    e devolve os resultados na ordem de entrada; no máximo `window` tarefas
+    ficam pendentes.
+    """
+    import asyncio
+    concurrency = max(1, int(concurrency))
+    window = window or concurrency * 2
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def guarded(item):
+        async with semaphore:
+            return await fn(item)
+
+    pending = deque()
+    try:
+        async with aclosing(items):
+            async for item in items:
+                pending.append(asyncio.ensure_future(guarded(item)))
+                if len(pending) >= window:
+                    yield await pending.popleft()
+        while pending:
+            yield await pending.popleft()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+# -------------------------------------------------------------------
+# Inicialização: imports sob demanda, .env e pasta csv
+# -------------------------------------------------------------------
+
+class StartupTiming:
+    """
+    Marcos da inicialização, em ms desde o início do carregamento do módulo
+    (o tempo do próprio interpretador fica de fora; para ele, -X importtime),
+    mais o tempo de cada import feito por lazy_import. report() monta o
+    relatório mostrado com --startup-timing.
+    """
+
+    def __init__(self, started_at: float):
+        self.started_at = started_at
+        self.marks = []
+        self.imports = []
+        self._lock = threading.Lock()
+
+    def _now_ms(self) -> float:
+        return (time.perf_counter() - self.started_at) * 1000
+
+    def mark(self, name: str):
+        with self._lock:
+            self.marks.append((name, self._now_ms()))
+
+    def record_import(self, module: str, elapsed_ms: float):
+        with self._lock:
+            self.imports.append((module, elapsed_ms, threading.current_thread().name))
+
+    def report(self) -> str:
+        with self._lock:
+            lines = ["⏱️ Inicialização (ms desde o carregamento do módulo):"]
+            lines += [f"  {at:8.1f}  {name}" for name, at in self.marks]
+            if self.imports:
+                lines.append("  imports sob demanda:")
+                lines += [f"  {ms:8.1f}  {module} ({thread})" for module, ms, thread in self.imports]
+        return "\n".join(lines)
+
+
+STARTUP = StartupTiming(_MODULE_STARTED_AT)
+_import_lock = threading.Lock()
+
+
+def lazy_import(module: str):
+    """
+    Importa `module` no primeiro uso (registrando o tempo em STARTUP) e
+    devolve o módulo; nas próximas chamadas é só uma consulta a sys.modules.
+    """
+    loaded = sys.modules.get(module)
+    if loaded is not None and not getattr(loaded.__spec__, "_initializing", False):
+        return loaded
+    with _import_lock:
+        if module in sys.modules:
+            # outra thread importou (ou ainda está importando, fora de
+            # lazy_import): import_module espera o módulo ficar completo
+            return importlib.import_module(module)
+        start = time.perf_counter()
+        loaded = importlib.import_module(module)
+        STARTUP.record_import(module, (time.perf_counter() - start) * 1000)
+    return loaded
+
+
+_env_loaded = False
+
+
+def load_env():
+    """Carrega o .env (SPOTIPY_*) uma vez, antes do primeiro uso das credenciais."""
+    global _env_loaded
+    if not _env_loaded:
+        lazy_import("dotenv").load_dotenv()
+        _env_loaded = True
+
+
+def ensure_csv_dir():
+    os.makedirs(CSV_DIR, exist_ok=True)
+
+
+def ensure_parent_dir(path: str):
+    """Cria a pasta de `path`, se preciso, antes de gravar nele."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+
+# -------------------------------------------------------------------
+# Helpers de backend (Spotify / YouTube)
+# -------------------------------------------------------------------
+
+def extract_playlist_id(playlist_id_or_url: str) -> str:
+    """
+    Aceita tanto o ID puro quanto a URL da playlist do Spotify.
+    Ex:
+      - https://open.spotify.com/playlist/37i9dQZF1DXcBWIGoYBM5M
+        -> 37i9dQZF1DXcBWIGoYBM5M
+    """
+    if "open.spotify.com" in playlist_id_or_url:
+        parts = playlist_id_or_url.split("playlist/")
+        if len(parts) > 1:
+            return parts[1].split("?")[0]
+    return playlist_id_or_url.strip()
+
+
+# Registro de clientes: cada cliente é criado uma vez por arquivo de headers /
+# conjunto de credenciais e reutilizado por todas as ações e threads, junto
+# com uma única sessão HTTP (pool de conexões keep-alive).
+_clients_lock = threading.Lock()
+_http_session = None
+_yt_clients = {}
+_spotify_clients = {}
+
+
+def get_http_session() -> Session:
+    """
+    Sessão HTTP compartilhada, com pool dimensionado para vários workers.
+    """
+    global _http_session
+    requests = lazy_import("requests")
+    adapters = lazy_import("requests.adapters")
+    with _clients_lock:
+        if _http_session is None:
+            session = requests.Session()
+            adapter = adapters.HTTPAdapter(pool_connections=8, pool_maxsize=HTTP_POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _http_session = session
+        return _http_session
+
+
+def get_ytmusic(headers_file: str) -> YTMusic:
+    """
+    Cliente YTMusic reutilizável para um browser.json.
+    Se o arquivo for regravado (novos headers), um cliente novo é criado
+    na próxima chamada, sem precisar reiniciar o app.
+    """
+    path = os.path.abspath(headers_file)
+    key = (path, os.path.getmtime(path))
+    session = get_http_session()
+    ytmusicapi = lazy_import("ytmusicapi")
+    with _clients_lock:
+        client = _yt_clients.get(path)
+        if client is None or client[0] != key:
+            client = (key, ytmusicapi.YTMusic(path, requests_session=session))
+            _yt_clients[path] = client
+        return client[1]
+
+
+def get_spotify_client() -> Spotify:
+    """
+    Cliente Spotify com os escopos necessários, criado uma vez por conjunto
+    de credenciais. O token é renovado pelo SpotifyOAuth quando expira; a
+    renovação é serializada para as páginas buscadas em paralelo não
+    disputarem o mesmo refresh.
+    """
+    load_env()
+    credentials = (
+        os.getenv("SPOTIPY_CLIENT_ID"),
+        os.getenv("SPOTIPY_CLIENT_SECRET"),
+        os.getenv("SPOTIPY_REDIRECT_URI"),
+    )
+    session = get_http_session()
+    spotipy = lazy_import("spotipy")
+    oauth = lazy_import("spotipy.oauth2")
+    with _clients_lock:
+        client = _spotify_clients.get(credentials)
+        if client is None:
+            auth = oauth.SpotifyOAuth(
+                client_id=credentials[0],
+                client_secret=credentials[1],
+                redirect_uri=credentials[2],
+                scope="playlist-read-private user-library-read",
+                requests_session=session,
+            )
+            token_lock = threading.Lock()
+            get_access_token = auth.get_access_token
+
+            def locked_get_access_token(*args, **kwargs):
+                with token_lock:
+                    return get_access_token(*args, **kwargs)
+
+            auth.get_access_token = locked_get_access_token
+            client = spotipy.Spotify(auth_manager=auth, requests_session=session)
+            _spotify_clients[credentials] = client
+        return client
+
+
+def iter_pages(fetch_page, first_page=None):
+    """
+    Percorre as páginas de um endpoint offset/limit do Spotify, uma de cada vez.
+    fetch_page(offset) deve retornar a página que começa em offset.
+    """
+    page = first_page if first_page is not None else fetch_page(0)
+    while True:
+        yield page
+        if not page.get("next") or not page["items"]:
+            return
+        page = fetch_page(page.get("offset", 0) + len(page["items"]))
+
+
+class SpotifyItem:
+    """
+    Item de playlist/curtidas reduzido ao que o CSV usa. As páginas são
+    convertidas assim que chegam (compact_spotify_page), então os dicts
+    completos da API não ficam na memória enquanto a biblioteca é lida.
+    Itens sem faixa (removidas, episódios etc.) têm name=None.
+    """
+
+    __slots__ = ("artist", "name", "album", "duration_ms", "isrc", "id", "added_at")
+
+    def __init__(self, artist, name, album, duration_ms, isrc, id, added_at):
+        self.artist = artist
+        self.name = name
+        self.album = album
+        self.duration_ms = duration_ms
+        self.isrc = isrc
+        self.id = id
+        self.added_at = added_at
+
+    @classmethod
+    def from_api(cls, item: dict) -> "SpotifyItem":
+        track = item.get("track")
+        if not track:
+            return cls(None, None, None, None, None, None, item.get("added_at"))
+        artists = track.get("artists") or [{}]
+        return cls(
+            artists[0].get("name") or "",
+            track.get("name") or "",
+            (track.get("album") or {}).get("name", ""),
+            track.get("duration_ms"),
+            (track.get("external_ids") or {}).get("isrc", ""),
+            track.get("id"),
+            item.get("added_at"),
+        )
+
+    @property
+    def empty(self) -> bool:
+        return self.name is None
+
+    def __repr__(self):
+        return f"SpotifyItem({self.artist!r}, {self.name!r}, id={self.id!r})"
+
+
+def compact_spotify_page(page: dict) -> dict:
+    """Troca os itens de uma página da API por SpotifyItem (no próprio dict)."""
+    page["items"] = [SpotifyItem.from_api(item) for item in page["items"]]
+    return page
+
+
+def _spotify_item_key(item: SpotifyItem, position: int):
+    if item.empty:
+        return ("#", position)  # itens vazios nunca são considerados duplicatas
+    return (item.id or (item.name, item.artist), item.added_at)
+
+
+def iter_items_parallel(sp: Spotify, fetch_page, fan_out: int = SPOTIFY_FAN_OUT_DEFAULT, first_page=None, log=None):
+    """
+    Pagina um endpoint offset/limit do Spotify em paralelo.
+    A primeira resposta já traz `total` e `limit`, então os offsets restantes
+    são pedidos ao mesmo tempo (até fan_out por vez) e os itens saem na ordem.
+    Se a biblioteca mudar durante a leitura (total diferente ou página menor
+    que o esperado), itens que já vieram numa página anterior são descartados
+    e, no fim, uma releitura sequencial recupera os que escorregaram entre
+    páginas. Sem mudança nada é descartado: a mesma faixa pode aparecer duas
+    vezes numa playlist, até com o mesmo added_at.
+    fetch_page(offset) deve retornar a página que começa em offset.
+    """
+    first = first_page if first_page is not None else fetch_page(0)
+    total = first["total"]
+    limit = first.get("limit") or len(first["items"]) or 1
+
+    seen = set()
+    changed = False
+    position = 0
+
+    pages = ordered_map(fetch_page, range(limit, total, limit), fan_out)
+    for offset, page in zip(range(0, total or 1, limit), chain([first], pages)):
+        expected = min(limit, total - offset)
+        if page["total"] != total or len(page["items"]) < expected:
+            changed = True
+        page_keys = []
+        for item in page["items"]:
+            key = _spotify_item_key(item, position)
+            position += 1
+            page_keys.append(key)
+            if changed and key in seen:
+                continue
+            yield item
+        seen.update(page_keys)
+
+    if changed:
+        if log:
+            log("⚠️ A biblioteca mudou durante a leitura; conferindo faixas que faltaram...")
+        for page in iter_pages(fetch_page):
+            for item in page["items"]:
+                key = _spotify_item_key(item, position)
+                position += 1
+                if not item.empty and key not in seen:
+                    seen.add(key)
+                    yield item
+
+
+def spotify_limiter() -> AdaptiveRateLimiter:
+    return AdaptiveRateLimiter(SPOTIFY_RATE_DEFAULT, max_rate=SPOTIFY_RATE_MAX)
+
+
+def liked_tracks_fetcher(sp: Spotify, limiter: AdaptiveRateLimiter = None, metrics: RunMetrics = None):
+    """
+    fetch_page(offset) para as curtidas, passando pelo controle de ritmo.
+    O endpoint não aceita `fields`; os itens viram SpotifyItem logo ao chegar.
+    """
+    limiter = limiter or spotify_limiter()
+    metrics = metrics or PROCESS_METRICS
+    return lambda offset: compact_spotify_page(limiter.timed_call(
+        metrics, "spotify.page", sp.current_user_saved_tracks, limit=SPOTIFY_SAVED_PAGE_LIMIT, offset=offset
+    ))
+
+
+def playlist_tracks_fetcher(
+    sp: Spotify, playlist_id: str, limiter: AdaptiveRateLimiter = None, metrics: RunMetrics = None
+):
+    """
+    fetch_page(offset) para uma playlist, passando pelo controle de ritmo.
+    Pede só os campos de SPOTIFY_PLAYLIST_FIELDS, 100 itens por página.
+    """
+    limiter = limiter or spotify_limiter()
+    metrics = metrics or PROCESS_METRICS
+    return lambda offset: compact_spotify_page(limiter.timed_call(
+        metrics,
+        "spotify.page",
+        sp.playlist_tracks,
+        playlist_id,
+        fields=SPOTIFY_PLAYLIST_FIELDS,
+        limit=SPOTIFY_PLAYLIST_PAGE_LIMIT,
+        offset=offset,
+    ))
+
+
+def iter_liked_tracks(sp: Spotify, fan_out: int = SPOTIFY_FAN_OUT_DEFAULT, limiter: AdaptiveRateLimiter = None):
+    """
+    Gera as 'músicas curtidas' (saved tracks) do usuário como SpotifyItem,
+    com páginas em paralelo.
+    """
+    yield from iter_items_parallel(sp, liked_tracks_fetcher(sp, limiter), fan_out)
+
+
+def iter_playlist_tracks(
+    sp: Spotify, playlist_id: str, fan_out: int = SPOTIFY_FAN_OUT_DEFAULT, limiter: AdaptiveRateLimiter = None
+):
+    """
+    Gera os itens de uma playlist do Spotify como SpotifyItem, com páginas em paralelo.
+    """
+    yield from iter_items_parallel(sp, playlist_tracks_fetcher(sp, playlist_id, limiter), fan_out)
+
+
+def spotify_item_to_row(item: SpotifyItem):
+    """
+    Converte um SpotifyItem em linha com as colunas de CSV_COLUMNS (mais
+    AddedAt, usado pela sincronização incremental).
+    Retorna None para itens sem faixa (removidas, episódios locais etc.).
+    """
+    if item.empty:
+        return None
+    return {
+        "Artist": item.artist,
+        "Track": item.name,
+        "Album": item.album or "",
+        "DurationMs": item.duration_ms or "",
+        "ISRC": item.isrc or "",
+        "SpotifyId": item.id,
+        "AddedAt": item.added_at,
+    }
+
+
+class TrackStore:
+    """
+    Armazém intermediário de uma biblioteca exportada (SQLite em CSV_DIR):
+    uma linha por faixa com os metadados do Spotify, a chave normalizada
+    (song_key) e o resultado do casamento (status, videoId, confiança).
+    As linhas são lidas sob demanda, em blocos ordenados por posição, e uma
+    nova rodada pode pular o que já foi resolvido (ver unresolved()).
+    O CSV continua disponível como visão opcional (export_csv).
+    Pode ser usado por várias threads.
+    """
+
+    COLUMNS = ("artist", "track", "album", "duration_ms", "isrc", "spotify_id", "added_at")
+    ROW_KEYS = ("Artist", "Track", "Album", "DurationMs", "ISRC", "SpotifyId", "AddedAt")
+    FLUSH_EVERY = 500
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._inserts = []
+        self._results = []
+        ensure_parent_dir(path)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS tracks (
+                    pos INTEGER PRIMARY KEY,
+                    artist TEXT NOT NULL,
+                    track TEXT NOT NULL,
+                    album TEXT,
+                    duration_ms INTEGER,
+                    isrc TEXT,
+                    spotify_id TEXT,
+                    added_at TEXT,
+                    song_key INTEGER NOT NULL,
+                    status TEXT,
+                    video_id TEXT,
+                    confidence REAL,
+                    updated_at REAL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_tracks_status ON tracks(status)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_tracks_song_key ON tracks(song_key)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            self._conn.commit()
+
+    # ---- escrita
+
+    def reset(self):
+        """Apaga as faixas e os desfechos (nova exportação da mesma biblioteca); meta é mantido."""
+        with self._lock:
+            self._inserts.clear()
+            self._results.clear()
+            self._conn.execute("DELETE FROM tracks")
+            self._conn.commit()
+
+    def append(self, pos: int, row: dict):
+        """Acrescenta uma linha (colunas de CSV_COLUMNS) na posição `pos`."""
+        values = [row.get(k) or None for k in self.ROW_KEYS]
+        values[0], values[1] = row.get("Artist", ""), row.get("Track", "")
+        with self._lock:
+            self._inserts.append((pos, *values, song_key(values[0], values[1])))
+            due = len(self._inserts) >= self.FLUSH_EVERY
+        if due:
+            self.flush()
+
+    def record(self, pos: int, status: str, video_id: str = None, confidence: float = None):
+        """Guarda o desfecho de uma linha ("added", "review", "not_found", "error")."""
+        with self._lock:
+            self._results.append((status, video_id, confidence, time.time(), pos))
+            due = len(self._results) >= self.FLUSH_EVERY
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            inserts, self._inserts = self._inserts, []
+            results, self._results = self._results, []
+            if inserts:
+                self._conn.executemany(
+                    f"INSERT OR REPLACE INTO tracks (pos, {', '.join(self.COLUMNS)}, song_key) "
+                    f"VALUES ({', '.join('?' * (len(self.COLUMNS) + 2))})",
+                    inserts,
+                )
+            if results:
+                self._conn.executemany(
+                    "UPDATE tracks SET status = ?, video_id = ?, confidence = ?, updated_at = ? WHERE pos = ?",
+                    results,
+                )
+            if inserts or results:
+                self._conn.commit()
+
+    def set_meta(self, key: str, value):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+            self._conn.commit()
+
+    def get_meta(self, key: str, default=None):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    # ---- leitura
+
+    def _count(self, where: str = "1") -> int:
+        self.flush()
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM tracks WHERE {where}").fetchone()[0]
+
+    def _iter(self, where: str = "1", chunk: int = 1000):
+        self.flush()
+        last = -1
+        while True:
+            with self._lock:
+                batch = self._conn.execute(
+                    f"SELECT pos, {', '.join(self.COLUMNS)} FROM tracks "
+                    f"WHERE pos > ? AND ({where}) ORDER BY pos LIMIT ?",
+                    (last, chunk),
+                ).fetchall()
+            if not batch:
+                return
+            for pos, *values in batch:
+                row = {k: ("" if v is None else v) for k, v in zip(self.ROW_KEYS, values)}
+                row["_pos"] = pos
+                yield row
+            last = batch[-1][0]
+
+    def rows(self):
+        """Todas as linhas, em ordem (len() disponível), para import_tracks_to_ytmusic."""
+        return _StoreRows(self, "1")
+
+    def unresolved(self):
+        """Só as linhas ainda não resolvidas (pendentes, não encontradas, em revisão ou com erro)."""
+        return _StoreRows(self, "status IS NULL OR status IN ('not_found', 'review', 'error')")
+
+    def video_ids(self):
+        """videoIds já adicionados à playlist (para não reenviar)."""
+        self.flush()
+        with self._lock:
+            return {r[0] for r in self._conn.execute("SELECT video_id FROM tracks WHERE status = 'added'")}
+
+    def status_counts(self) -> dict:
+        self.flush()
+        with self._lock:
+            return dict(self._conn.execute("SELECT COALESCE(status, 'pending'), COUNT(*) FROM tracks GROUP BY 1"))
+
+    def export_csv(self, csv_path: str, with_results: bool = False):
+        """Grava a visão CSV (colunas de CSV_COLUMNS, opcionalmente com o resultado)."""
+        fields = list(CSV_COLUMNS) + (["Status", "VideoId", "Confidence"] if with_results else [])
+        keys = list(self.ROW_KEYS) + ["Status", "VideoId", "Confidence"]
+        self.flush()
+        ensure_parent_dir(csv_path)
+        with open(csv_path, mode="w", newline="", encoding="utf-8") as file:
+            writer = csv.DictWriter(file, fieldnames=fields, extrasaction="ignore")
+            writer.writeheader()
+            last = -1
+            while True:
+                with self._lock:
+                    batch = self._conn.execute(
+                        f"SELECT pos, {', '.join(self.COLUMNS)}, status, video_id, confidence FROM tracks "
+                        "WHERE pos > ? ORDER BY pos LIMIT 1000",
+                        (last,),
+                    ).fetchall()
+                if not batch:
+                    break
+                for pos, *values in batch:
+                    writer.writerow({k: ("" if v is None else v) for k, v in zip(keys, values)})
+                last = batch[-1][0]
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+
+class _StoreRows:
+    """Visão iterável (com len) de um TrackStore, lida sob demanda."""
+
+    def __init__(self, store: TrackStore, where: str):
+        self.store = store
+        self.where = where
+
+    def __len__(self):
+        return self.store._count(self.where)
+
+    def __iter__(self):
+        return self.store._iter(self.where)
+
+
+class SpotifyTrackStream:
+    """
+    Fluxo de linhas {"Artist", "Track"} lidas do Spotify conforme as páginas chegam.
+    Cada linha é gravada no CSV (se csv_path for informado) no momento em que é
+    lida, e o fluxo pode ser passado direto para import_tracks_to_ytmusic, que
+    começa a buscar no YouTube Music enquanto o Spotify ainda está paginando.
+    len() baixa só a primeira página para descobrir o total; as demais são
+    buscadas em paralelo (fan_out) por iter_items_parallel.
+    Com `store` (TrackStore), cada linha também é gravada no armazém, que é
+    zerado no início, e recebe "_pos" (a posição dela lá).
+    """
+
+    def __init__(
+        self,
+        sp: Spotify,
+        fetch_page,
+        log,
+        csv_path: str = None,
+        label: str = "músicas",
+        fan_out: int = SPOTIFY_FAN_OUT_DEFAULT,
+        store: TrackStore = None,
+    ):
+        self.sp = sp
+        self.log = log
+        self.csv_path = csv_path
+        self.store = store
+        self.label = label
+        self.fan_out = fan_out
+        self.count = 0
+        self._fetch_page = fetch_page
+        self._first_page = None
+
+    def first_page(self):
+        if self._first_page is None:
+            self._first_page = self._fetch_page(0)
+        return self._first_page
+
+    def __len__(self):
+        return self.first_page()["total"]
+
+    def __iter__(self):
+        if self.csv_path:
+            ensure_parent_dir(self.csv_path)
+        file = open(self.csv_path, mode="w", newline="", encoding="utf-8") if self.csv_path else None
+        try:
+            writer = csv.DictWriter(file, fieldnames=CSV_COLUMNS, extrasaction="ignore") if file else None
+            if writer:
+                writer.writeheader()
+            if self.store:
+                self.store.reset()
+
+            items = iter_items_parallel(
+                self.sp, self._fetch_page, self.fan_out, first_page=self.first_page(), log=self.log
+            )
+            for item in items:
+                row = spotify_item_to_row(item)
+                if row is None:
+                    # linha vazia: o import a ignora, mas o progresso
+                    # continua batendo com o total informado pelo Spotify
+                    yield {"Artist": "", "Track": ""}
+                    continue
+                if writer:
+                    writer.writerow(row)
+                if self.store:
+                    row["_pos"] = self.count
+                    self.store.append(self.count, row)
+                self.count += 1
+                yield row
+        finally:
+            if file:
+                file.close()
+            if self.store:
+                self.store.flush()
+
+        destino = f" salvas em '{self.csv_path}'" if self.csv_path else ""
+        self.log(f"✅ Exportação concluída! {self.count} {self.label}{destino}.")
+
+
+def stream_spotify_playlist(
+    playlist_id_or_url: str,
+    log,
+    csv_path: str = None,
+    fan_out: int = SPOTIFY_FAN_OUT_DEFAULT,
+    limiter: AdaptiveRateLimiter = None,
+    metrics: RunMetrics = None,
+    store: TrackStore = None,
+) -> SpotifyTrackStream:
+    """
+    Abre um fluxo das faixas de uma playlist NORMAL do Spotify.
+    metrics recebe o tempo de cada página ("spotify.page"); store (TrackStore)
+    recebe as linhas conforme chegam.
+    """
+    sp = get_spotify_client()
+    playlist_id = extract_playlist_id(playlist_id_or_url)
+    log(f"\nLendo playlist do Spotify ({playlist_id})...")
+    return SpotifyTrackStream(
+        sp, playlist_tracks_fetcher(sp, playlist_id, limiter, metrics), log, csv_path, fan_out=fan_out, store=store
+    )
+
+
+def stream_liked_songs(
+    log,
+    csv_path: str = None,
+    fan_out: int = SPOTIFY_FAN_OUT_DEFAULT,
+    limiter: AdaptiveRateLimiter = None,
+    metrics: RunMetrics = None,
+    store: TrackStore = None,
+) -> SpotifyTrackStream:
+    """
+    Abre um fluxo das MÚSICAS CURTIDAS do usuário.
+    metrics recebe o tempo de cada página ("spotify.page"); store (TrackStore)
+    recebe as linhas conforme chegam.
+    """
+    sp = get_spotify_client()
+    log("\nLendo MINHAS MÚSICAS CURTIDAS do Spotify...")
+    return SpotifyTrackStream(
+        sp,
+        liked_tracks_fetcher(sp, limiter, metrics),
+        log,
+        csv_path,
+        label="músicas curtidas",
+        fan_out=fan_out,
+        store=store,
+    )
+
+
+def export_spotify_playlist_to_csv(playlist_id_or_url: str, csv_path: str, log):
+    """
+    Exporta uma playlist NORMAL do Spotify para CSV (colunas: CSV_COLUMNS).
+    As linhas são gravadas conforme as páginas chegam.
+    """
+    for _ in stream_spotify_playlist(playlist_id_or_url, log, csv_path):
+        pass
+
+
+def export_liked_songs_to_csv(csv_path: str, log):
+    """
+    Exporta as MÚSICAS CURTIDAS do usuário para CSV.
+    As linhas são gravadas conforme as páginas chegam.
+    """
+    for _ in stream_liked_songs(log, csv_path):
+        pass
+
+
+class PlaylistWriter:
+    """
+    Acumula videoIds e envia para a playlist em lotes (add_playlist_items),
+    em vez de uma chamada por faixa. O lote é enviado ao atingir batch_size
+    ou quando o item mais antigo do buffer passa de flush_seconds.
+    Se um lote falhar, ele é dividido ao meio até isolar o item problemático
+    (falhas transitórias/429 são antes repetidas pelo limiter, se houver).
+    A ordem de inserção é sempre a ordem em que add() foi chamado.
+    Com background=True o buffer e os envios ficam numa thread própria, que
+    recebe os itens por uma fila de até queue_size lotes (quem chama add()
+    só espera se o envio ficar para trás) e confere o prazo de flush_seconds
+    sozinha, mesmo sem novos add(). Sem ela, o prazo só é conferido a cada
+    add() ou flush_if_due(). on_flushed(payloads) é chamado depois que o
+    lote com esses itens foi enviado, só com os que foram de fato
+    adicionados (ou já estavam na playlist); on_failed(payloads) recebe os
+    que não puderam ser. Com background=True ambos rodam na thread do
+    escritor. flush() espera os lotes em andamento e close() encerra a thread.
+    """
+
+    _FLUSH = object()  # marcador na fila: enviar o buffer agora
+
+    def __init__(
+        self,
+        yt,
+        playlist_id: str,
+        log,
+        batch_size: int = ADD_BATCH_SIZE_DEFAULT,
+        flush_seconds: float = ADD_FLUSH_SECONDS_DEFAULT,
+        limiter: AdaptiveRateLimiter = None,
+        on_flushed=None,
+        metrics: RunMetrics = None,
+        background: bool = False,
+        queue_size: int = 2,
+        on_failed=None,
+    ):
+        self.yt = yt
+        self.limiter = limiter
+        self.metrics = metrics
+        self.on_flushed = on_flushed
+        self.on_failed = on_failed
+        self.playlist_id = playlist_id
+        self.log = log
+        self.batch_size = max(1, int(batch_size))
+        self.flush_seconds = flush_seconds
+        self.added = 0
+        self.failed = []
+        self.requests = 0
+        self._buffer = []
+        self._first_at = None
+        self._seen_ids = set()
+        self._error = None
+        self._queue = None
+        self._thread = None
+        if background:
+            self._queue = queue.Queue(maxsize=max(1, queue_size) * self.batch_size)
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def mark_known(self, video_ids):
+        """Registra videoIds que já estão na playlist, para não reenviá-los."""
+        self._seen_ids.update(v for v in video_ids if v)
+
+    def add(self, video_id: str, label: str, payload=None):
+        if video_id in self._seen_ids:
+            self.log(f"  ↪️ Já está na playlist: {label}")
+            if payload is not None and self.on_flushed:
+                if self._queue is not None:
+                    self._queue.put((None, label, payload))  # on_flushed na thread do escritor
+                else:
+                    self.on_flushed([payload])
+            return
+        self._seen_ids.add(video_id)
+        if self._queue is not None:
+            self._queue.put((video_id, label, payload))  # bloqueia se o envio estiver atrasado
+            return
+        self._append((video_id, label, payload))
+        self.flush_if_due()
+
+    def flush_if_due(self):
+        if self._buffer and time.monotonic() - self._first_at >= self.flush_seconds:
+            self._handoff()
+
+    @property
+    def backlogged(self) -> bool:
+        """Se add/flush teriam de esperar a fila do escritor (podem bloquear)."""
+        return self._queue is not None and self._queue.full()
+
+    def flush(self):
+        """Envia o buffer e espera todos os lotes pendentes."""
+        if self._queue is None:
+            self._handoff()
+            return
+        self._queue.put(self._FLUSH)
+        self._queue.join()
+        if self._error is not None:
+            raise self._error
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            if self._thread:
+                self._queue.put(None)
+                self._thread.join()
+                self._thread = None
+
+    def _append(self, item):
+        if not self._buffer:
+            self._first_at = time.monotonic()
+        self._buffer.append(item)
+        if len(self._buffer) >= self.batch_size:
+            self._handoff()
+
+    def _handoff(self):
+        if not self._buffer:
+            return
+        items, self._buffer = self._buffer, []
+        self._first_at = None
+        self._deliver(items)
+
+    def _run(self):
+        while True:
+            timeout = None
+            if self._buffer:
+                timeout = max(0.0, self._first_at + self.flush_seconds - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                self._process(self._FLUSH)  # o item mais antigo venceu o prazo
+                continue
+            try:
+                if item is None:
+                    return
+                self._process(item)
+            finally:
+                self._queue.task_done()
+
+    def _process(self, item):
+        if self._error is not None:
+            return  # o erro sobe no próximo flush(); o resto é descartado
+        try:
+            if item is self._FLUSH:
+                self._handoff()
+            elif item[0] is None:
+                self.on_flushed([item[2]])
+            else:
+                self._append(item)
+        except Exception as e:
+            self._error = e
+
+    def _deliver(self, items):
+        added = {id(item) for item in self._send(items)}
+        payloads = [item[2] for item in items if id(item) in added and item[2] is not None]
+        if payloads and self.on_flushed:
+            self.on_flushed(payloads)
+        failed = [item[2] for item in items if id(item) not in added and item[2] is not None]
+        if failed and self.on_failed:
+            self.on_failed(failed)
+
+    def _send(self, items) -> list:
+        """Envia items (dividindo o lote se falhar); retorna os que foram adicionados."""
+        self.requests += 1
+        video_ids = [item[0] for item in items]
+        try:
+            if self.limiter:
+                response = self.limiter.timed_call(
+                    self.metrics, "yt.add", self.yt.add_playlist_items, self.playlist_id, video_ids
+                )
+            else:
+                response = self.yt.add_playlist_items(self.playlist_id, video_ids)
+            if isinstance(response, dict) and response.get("status", "STATUS_SUCCEEDED") != "STATUS_SUCCEEDED":
+                raise RuntimeError(f"status {response.get('status')}")
+        except Exception as e:
+            if len(items) == 1:
+                video_id, label, _ = items[0]
+                self.failed.append(label)
+                self._seen_ids.discard(video_id)  # pode ser tentado de novo
+                self.log(f"  ⚠️ Erro ao adicionar '{label}': {e}")
+                return []
+            # divide o lote para achar o(s) item(ns) com problema
+            mid = len(items) // 2
+            return self._send(items[:mid]) + self._send(items[mid:])
+
+        self.added += len(items)
+        if self.metrics:
+            self.metrics.inc("yt.add.items", len(items))
+        self.log(f"  📥 Lote de {len(items)} faixa(s) adicionado à playlist.")
+        return items
+
+
+class ImportJournal:
+    """
+    Diário de checkpoint de uma importação (JSON lines, só acrescenta).
+    Primeira linha: {"type": "start", "playlist_id": ...}; depois uma linha
+    por linha processada do CSV ({"row": índice, "id", "status", "video_id",
+    "query", "confidence"}); "id" (journal_row_id) confere, na retomada, se o
+    índice ainda aponta para a mesma faixa.
+    Linhas com status "error" (busca ou escrita que falhou) não contam como
+    processadas: a retomada tenta de novo, e o registro "done" só é gravado
+    quando não sobra nenhuma.
+    As gravações vão para o disco com fsync em lotes (a cada fsync_every
+    registros ou fsync_seconds), não a cada linha.
+    """
+
+    def __init__(self, path: str, fsync_every: int = 50, fsync_seconds: float = 2.0):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_seconds = fsync_seconds
+        self._file = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._lock = threading.RLock()  # linhas não encontradas e lotes enviados chegam de threads diferentes
+
+    @staticmethod
+    def load(path: str):
+        """
+        Lê um diário existente. Retorna (registro_start, {índice: registro})
+        ou (None, {}) se não houver diário. Uma última linha truncada (queda
+        no meio da escrita) é ignorada.
+        """
+        if not os.path.exists(path):
+            return None, {}
+        start, done_rows = None, {}
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                if record.get("type") == "start":
+                    start, done_rows = record, {}
+                elif "row" in record:
+                    done_rows[record["row"]] = record
+                elif record.get("type") == "done" and start is not None:
+                    start["done"] = True
+        return start, done_rows
+
+    def open(self, start_record: dict = None):
+        """Abre para acrescentar; com start_record, começa um diário novo."""
+        ensure_parent_dir(self.path)
+        self._file = open(self.path, "w" if start_record else "a", encoding="utf-8")
+        if start_record:
+            self.write([dict(start_record, type="start")], force_sync=True)
+
+    def write(self, records, force_sync: bool = False):
+        with self._lock:
+            for record in records:
+                self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+                self._unsynced += 1
+            due = time.monotonic() - self._last_sync >= self.fsync_seconds
+            if self._unsynced and (force_sync or due or self._unsynced >= self.fsync_every):
+                self.sync()
+
+    def sync(self):
+        with self._lock:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+            self._last_sync = time.monotonic()
+
+    def close(self, done: bool = False):
+        with self._lock:
+            if self._file is None:
+                return
+            if done:
+                self.write([{"type": "done"}])
+            self.sync()
+            self._file.close()
+            self._file = None
+
+
+def compact_search_result(item: dict) -> dict:
+    """
+    Reduz um resultado de yt.search aos campos que usamos, mantendo o mesmo
+    formato (artists/album como dicts) para quem já consome o resultado cru.
+    """
+    album = item.get("album") or {}
+    return {
+        "videoId": item.get("videoId"),
+        "title": item.get("title", ""),
+        "artists": [{"name": a.get("name", "")} for a in item.get("artists") or []],
+        "album": {"name": album.get("name", "")},
+        "duration_seconds": item.get("duration_seconds"),
+    }
+
+
+_PUNCT_RE = re.compile(r"[^\w\s]", re.UNICODE)
+
+# Palavras que indicam outra versão da faixa (ao vivo, cover, karaokê...)
+_VERSION_TOKENS = frozenset({
+    "live", "vivo", "cover", "karaoke", "instrumental", "remix", "acoustic",
+    "acustico", "tribute", "sped", "slowed", "8d", "reverb",
+})
+
+
+@lru_cache(maxsize=65536)
+def normalize_tokens(text: str) -> frozenset:
+    """
+    Tokens normalizados (casefold, sem acentos e pontuação) de um texto.
+    Memoizado: artistas e títulos repetidos são normalizados uma vez só.
+    """
+    return frozenset(normalize_text(text).split())
+
+
+def normalize_text(text: str) -> str:
+    """Texto em casefold, sem acentos e sem pontuação, com espaços simples."""
+    text = unicodedata.normalize("NFKD", (text or "").casefold())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(_PUNCT_RE.sub(" ", text).split())
+
+
+# " - Remastered 2011", " - Radio Edit", "(feat. X)", "[Mono Version]"...
+_TITLE_NOISE_RE = re.compile(
+    r"\s+-\s+(?:\d{4}\s+)?(?:remaster(?:ed)?|re-?master|radio edit|single version|album version|"
+    r"mono|stereo|original mix|bonus track|deluxe)\b.*$"
+    r"|\s*[\(\[](?:feat\.?|ft\.?|featuring|with|com|part\.?)\s[^\)\]]*[\)\]]"
+    r"|\s*[\(\[][^\)\]]*(?:remaster(?:ed)?|version|edit|mono|stereo|deluxe)[^\)\]]*[\)\]]",
+    re.IGNORECASE,
+)
+# Para song_key, só remaster e participações: "(Live Version)", "(Radio Edit)"
+# etc. continuam distinguindo gravações diferentes da mesma música
+_SONG_KEY_NOISE_RE = re.compile(
+    r"\s+-\s+(?:\d{4}\s+)?(?:remaster(?:ed)?|re-?master(?:ed)?)\b.*$"
+    r"|\s*[\(\[](?:feat\.?|ft\.?|featuring|with|com|part\.?)\s[^\)\]]*[\)\]]"
+    r"|\s*[\(\[][^\)\]]*\bre-?master(?:ed)?\b[^\)\]]*[\)\]]",
+    re.IGNORECASE,
+)
+# Só marcadores explícitos de participação: vírgulas, "&", "e" e "x" fazem
+# parte de nomes como "Earth, Wind & Fire", "Tyler, The Creator" e "E-40"
+_ARTIST_SPLIT_RE = re.compile(r"\s+[\(\[]?(?:feat\.?|ft\.|featuring)\s+", re.IGNORECASE)
+
+
+def _strip_title_noise(pattern: re.Pattern, track: str) -> str:
+    def drop(match):
+        # "(Live Version)", "- Acoustic Remaster": qualificador de versão fica
+        return match.group(0) if normalize_tokens(match.group(0)) & _VERSION_TOKENS else ""
+
+    cleaned = pattern.sub(drop, track or "").strip()
+    return cleaned or (track or "").strip()
+
+
+def clean_track_title(track: str) -> str:
+    """
+    Remove sufixos de remaster/edição e participações do título (para buscas
+    e pontuação). Ao vivo, acústico, remix etc. são mantidos.
+    """
+    return _strip_title_noise(_TITLE_NOISE_RE, track)
+
+
+def primary_artist(artist: str) -> str:
+    """Artista principal de 'A feat. B' / 'A (ft. B)'; o resto do nome fica intacto."""
+    parts = [p for p in _ARTIST_SPLIT_RE.split(artist or "") if p]
+    return parts[0].strip() if parts else (artist or "").strip()
+
+
+def _strip_accents(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def journal_row_id(row: dict):
+    """Identidade de uma linha no diário: Spotify ID, ou song_key sem ele."""
+    return row.get("SpotifyId") or song_key(row.get("Artist", ""), row.get("Track", ""))
+
+
+def song_key(artist: str, track: str) -> int:
+    """
+    Identidade de uma música para deduplicação e para o índice global de
+    resoluções: hash de 64 bits (inteiro com sinal, cabe num INTEGER do
+    SQLite) do artista principal + título sem remaster e participações,
+    normalizados. Assim "Beyoncé feat. JAY-Z" / "Crazy In Love (feat. JAY-Z)"
+    e "Beyonce" / "Crazy in Love" caem na mesma chave, mas "Lithium" e
+    "Lithium (Live Version)" não.
+    """
+    title = _strip_title_noise(_SONG_KEY_NOISE_RE, track)
+    text = normalize_text(primary_artist(artist)) + "\x1f" + normalize_text(title)
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "big", signed=True)
+
+
+def build_query_variants(artist: str, track: str, variants=QUERY_VARIANTS_DEFAULT):
+    """
+    Consultas alternativas para uma faixa, na ordem de `variants` (nomes em
+    QUERY_VARIANTS). A consulta completa "artista título" não entra aqui, e
+    variantes que repetem uma consulta anterior são descartadas.
+    """
+    title = clean_track_title(track)
+    main_artist = primary_artist(artist)
+    builders = {
+        "clean": lambda: f"{artist} {title}",
+        "primary_artist": lambda: f"{main_artist} {title}",
+        "ascii": lambda: _strip_accents(f"{main_artist} {title}"),
+        "track_only": lambda: title,
+    }
+    seen = {f"{artist} {track}".strip().casefold()}
+    out = []
+    for name in variants:
+        query = builders[name]().strip()
+        if query and query.casefold() not in seen:
+            seen.add(query.casefold())
+            out.append((name, query))
+    return out
+
+
+def token_similarity(source: frozenset, candidate: frozenset) -> float:
+    """
+    Similaridade entre conjuntos de tokens: o maior entre o coeficiente de
+    Dice e a fração dos tokens da origem presentes no candidato (títulos do
+    YT costumam ter sufixos extras como '(feat. X)').
+    """
+    if not source or not candidate:
+        return 0.0
+    common = len(source & candidate)
+    return max(2.0 * common / (len(source) + len(candidate)), 0.9 * common / len(source))
+
+
+def _duration_score(source_seconds: float, candidate_seconds: float) -> float:
+    delta = abs(source_seconds - candidate_seconds)
+    if delta <= 3:
+        return 1.0
+    return max(0.0, 1.0 - (delta - 3) / 27.0)  # zera com 30s de diferença
+
+
+def pick_best_match(row: dict, candidates):
+    """
+    Pontua os candidatos de uma busca contra a linha de origem (título,
+    artista, duração e álbum, quando disponíveis) e devolve
+    (melhor_candidato, confiança entre 0 e 1). Versões alternativas (ao vivo,
+    cover, karaokê...) que a origem não pede são penalizadas.
+    """
+    title = normalize_tokens(row.get("Track", ""))
+    clean_title = normalize_tokens(clean_track_title(row.get("Track", "")))
+    artist = normalize_tokens(row.get("Artist", ""))
+    album = normalize_tokens(row.get("Album", ""))
+    try:
+        duration = float(row.get("DurationMs") or 0) / 1000.0
+    except ValueError:
+        duration = 0.0
+    source_versions = (title | album) & _VERSION_TOKENS
+
+    best, best_score = None, -1.0
+    for candidate in candidates:
+        if not candidate.get("videoId"):
+            continue
+        cand_title = normalize_tokens(candidate.get("title", ""))
+        cand_artists = frozenset().union(
+            *(normalize_tokens(a.get("name", "")) for a in candidate.get("artists") or [])
+        )
+        artist_score = token_similarity(artist, cand_artists)
+        parts = [
+            (0.45, max(token_similarity(title, cand_title), token_similarity(clean_title, cand_title))),
+            (0.30, artist_score),
+        ]
+        cand_duration = candidate.get("duration_seconds")
+        if duration and cand_duration:
+            parts.append((0.15, _duration_score(duration, cand_duration)))
+        cand_album = normalize_tokens((candidate.get("album") or {}).get("name", ""))
+        if album and cand_album:
+            parts.append((0.10, token_similarity(album, cand_album)))
+
+        score = sum(w * v for w, v in parts) / sum(w for w, _ in parts)
+        if (cand_title - title) & _VERSION_TOKENS - source_versions:
+            score *= 0.6
+        if artist and cand_artists and not artist_score:
+            score *= 0.6  # mesmo título, outro artista (comum em buscas só pelo título)
+        if score > best_score:
+            best, best_score = candidate, score
+
+    return best, max(best_score, 0.0)
+
+
+class SearchCache:
+    """
+    Cache persistente (SQLite em CSV_DIR) de buscas no YouTube Music.
+    Chave = consulta normalizada (artista, faixa ou variante da busca);
+    valor = videoId escolhido + top-N resultados compactos.
+    Entradas expiram por TTL e as menos acessadas são descartadas (LRU)
+    quando o cache passa de max_entries. Pode ser usado por várias threads.
+    Guarda também o índice ISRC -> videoId, que cresce a cada importação e
+    permite casar faixas pelo identificador exato, sem busca textual, e o
+    índice global de músicas (song_key -> videoId) compartilhado por todas as
+    migrações: cada música é buscada uma vez por biblioteca.
+    """
+
+    def __init__(
+        self,
+        path: str = SEARCH_CACHE_FILE,
+        ttl_seconds: float = SEARCH_CACHE_TTL_SECONDS,
+        max_entries: int = SEARCH_CACHE_MAX_ENTRIES,
+    ):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.isrc_hits = 0
+        self.song_hits = 0
+        self._lock = threading.Lock()
+        self._inflight = {}  # song_key -> Future da resolução em andamento
+        ensure_parent_dir(path)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS search_cache (
+                    key TEXT PRIMARY KEY,
+                    video_id TEXT,
+                    results TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_search_cache_accessed ON search_cache(accessed_at)"
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS isrc_index (
+                    isrc TEXT PRIMARY KEY,
+                    video_id TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS song_index (
+                    key INTEGER PRIMARY KEY,
+                    video_id TEXT NOT NULL,
+                    confidence REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            # song_key versão 1 juntava versões ao vivo/acústicas com a de
+            # estúdio: essas resoluções não valem mais
+            if self._conn.execute("PRAGMA user_version").fetchone()[0] < SONG_KEY_VERSION:
+                self._conn.execute("DELETE FROM song_index")
+                self._conn.execute(f"PRAGMA user_version = {SONG_KEY_VERSION}")
+            self._conn.commit()
+        self.evict()
+
+    @staticmethod
+    def make_key(*parts: str) -> str:
+        return "\x1f".join(p.strip().lower() for p in parts)
+
+    def get(self, key: str, metrics: RunMetrics = None):
+        """
+        Retorna (video_id, results) ou None se não houver entrada válida.
+        Com metrics, o acerto/falha também conta em cache.hits/cache.misses
+        da execução (o cache é compartilhado; hits/misses são do processo).
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT video_id, results, created_at FROM search_cache WHERE key = ?",
+                (key,),
+            ).fetchone()
+            hit = row is not None and now - row[2] <= self.ttl_seconds
+            if hit:
+                self._conn.execute(
+                    "UPDATE search_cache SET accessed_at = ? WHERE key = ?", (now, key)
+                )
+                self._conn.commit()
+                self.hits += 1
+            else:
+                self.misses += 1
+        if metrics is not None:
+            metrics.inc("cache.hits" if hit else "cache.misses")
+        return (row[0], json.loads(row[1])) if hit else None
+
+    def put(self, key: str, results, video_id: str = None, top_n: int = SEARCH_CACHE_TOP_N):
+        compact = [compact_search_result(r) for r in results[:top_n]]
+        if video_id is None and compact:
+            video_id = compact[0]["videoId"]
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO search_cache (key, video_id, results, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, video_id, json.dumps(compact, ensure_ascii=False), now, now),
+            )
+            self._conn.commit()
+        return compact
+
+    def set_video_id(self, key: str, video_id: str):
+        """Troca só o videoId escolhido de uma entrada (sem renovar o TTL)."""
+        with self._lock:
+            self._conn.execute("UPDATE search_cache SET video_id = ? WHERE key = ?", (video_id, key))
+            self._conn.commit()
+
+    def lookup_isrc(self, isrc: str, metrics: RunMetrics = None):
+        """videoId já associado a este ISRC em alguma importação, ou None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT video_id FROM isrc_index WHERE isrc = ?", (isrc.upper(),)
+            ).fetchone()
+            if row:
+                self.isrc_hits += 1
+        if row and metrics is not None:
+            metrics.inc("cache.isrc_hits")
+        return row[0] if row else None
+
+    def remember_isrc(self, isrc: str, video_id: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO isrc_index (isrc, video_id, updated_at) VALUES (?, ?, ?)",
+                (isrc.upper(), video_id, time.time()),
+            )
+            self._conn.commit()
+
+    def lookup_song(self, key: int, metrics: RunMetrics = None):
+        """(videoId, confiança) já resolvidos para esta música, ou None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT video_id, confidence FROM song_index WHERE key = ?", (key,)
+            ).fetchone()
+            if row:
+                self.song_hits += 1
+        if row and metrics is not None:
+            metrics.inc("cache.song_hits")
+        return (row[0], row[1]) if row else None
+
+    def remember_song(self, key: int, video_id: str, confidence: float):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO song_index (key, video_id, confidence, updated_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, video_id, confidence, time.time()),
+            )
+            self._conn.commit()
+
+    async def resolve_once_async(self, key: int, resolve):
+        """
+        Aguarda a corrotina resolve() da música `key`, garantindo uma
+        resolução por vez: chamadas simultâneas para a mesma música (em
+        linhas ou migrações diferentes) esperam e reaproveitam o resultado da
+        primeira, sem ocupar thread.
+        """
+        import asyncio
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+        if not owner:
+            return await asyncio.wrap_future(future)
+        try:
+            result = await resolve()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def evict(self):
+        """Remove entradas expiradas e, se necessário, as menos acessadas."""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM search_cache WHERE created_at < ?",
+                (time.time() - self.ttl_seconds,),
+            )
+            self._conn.execute(
+                "DELETE FROM search_cache WHERE key IN ("
+                "  SELECT key FROM search_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?"
+                ")",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+
+_search_cache = None
+_search_cache_lock = threading.Lock()
+
+
+def get_search_cache() -> SearchCache:
+    """Instância única do cache de buscas, compartilhada por todas as ações."""
+    global _search_cache
+    with _search_cache_lock:
+        if _search_cache is None:
+            _search_cache = SearchCache()
+        return _search_cache
+
+
+class ImportProgress:
+    """
+    Contadores de progresso de uma importação, atualizados pelas threads de
+    trabalho sem passar pelo loop da GUI. Quem exibe lê snapshot() no seu
+    próprio ritmo (a GUI faz polling a ~10 quadros/s); opcionalmente
+    on_report(snapshot) é chamado no máximo a cada `interval` segundos (modo
+    headless) e uma última vez em finish().
+    """
+
+    OUTCOMES = ("found", "review", "not_found", "errors", "skipped")
+
+    def __init__(self, on_report=None, interval: float = 1.0):
+        self.on_report = on_report
+        self.interval = interval
+        self._lock = threading.Lock()
+        self.start()
+
+    def start(self, total: int = None):
+        with self._lock:
+            self.total = total
+            self.done = 0
+            self.counts = dict.fromkeys(self.OUTCOMES, 0)
+            self.started_at = time.monotonic()
+            self.finished = False
+            self._last_report = 0.0
+
+    def count(self, outcome: str):
+        """Registra o desfecho de uma linha (um de OUTCOMES)."""
+        with self._lock:
+            self.counts[outcome] += 1
+
+    def step(self):
+        """Uma linha a mais processada (encontrada ou não)."""
+        with self._lock:
+            self.done += 1
+            now = time.monotonic()
+            due = self.on_report and now - self._last_report >= self.interval
+            if due:
+                self._last_report = now
+        if due:
+            self.on_report(self.snapshot())
+
+    def finish(self):
+        with self._lock:
+            self.finished = True
+        if self.on_report:
+            self.on_report(self.snapshot())
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            elapsed = max(time.monotonic() - self.started_at, 1e-6)
+            rate = self.done / elapsed
+            remaining = (self.total - self.done) if self.total else None
+            eta = remaining / rate if remaining is not None and rate > 0 else None
+            return dict(
+                done=self.done,
+                total=self.total,
+                **self.counts,
+                rate=round(rate, 2),
+                eta=None if eta is None else round(max(eta, 0.0), 1),
+                elapsed=round(elapsed, 1),
+                finished=self.finished,
+            )
+
+
+def format_progress(snapshot: dict) -> str:
+    """Resumo de uma linha de um ImportProgress.snapshot() para exibição."""
+    total = snapshot["total"] if snapshot["total"] is not None else "?"
+    text = f"Progresso: {snapshot['done']} / {total} · {snapshot['rate']:.1f} faixas/s"
+    if snapshot["eta"] is not None and not snapshot["finished"]:
+        minutes, seconds = divmod(int(snapshot["eta"]), 60)
+        text += f" · ETA {minutes}:{seconds:02d}"
+    return (
+        f"{text} · ✅ {snapshot['found']}  🟡 {snapshot['review']}  "
+        f"❌ {snapshot['not_found']}  ⚠️ {snapshot['errors']}"
+    )
+
+
+async def import_tracks_to_ytmusic_async(
+    rows,
+    new_playlist_name: str,
+    headers_file: str,
+    sleep_seconds: float,
+    log,
+    dedup: bool = True,
+    on_progress_init=None,
+    on_progress_step=None,
+    search_workers: int = SEARCH_WORKERS_DEFAULT,
+    add_batch_size: int = ADD_BATCH_SIZE_DEFAULT,
+    use_search_cache: bool = True,
+    playlist_id: str = None,
+    known_video_ids=None,
+    on_row_done=None,
+    on_row_failed=None,
+    journal_path: str = None,
+    resume: bool = False,
+    limiter: AdaptiveRateLimiter = None,
+    match_threshold: float = MATCH_CONFIDENCE_DEFAULT,
+    query_variants=QUERY_VARIANTS_DEFAULT,
+    progress: ImportProgress = None,
+    metrics: RunMetrics = None,
+    metrics_path: str = None,
+    track_store: TrackStore = None,
+    search_profiles=(),
+    search_pool: SearchPool = None,
+    executor: ThreadPoolExecutor = None,
+):
+    """
+    Importa as linhas {"Artist", "Track", ...} de `rows` (lista, DictReader ou
+    SpotifyTrackStream, consumido sob demanda) numa playlist nova do YouTube
+    Music, ou em playlist_id. Motor asyncio: até search_workers linhas são
+    resolvidas ao mesmo tempo e tudo que bloqueia (clientes, SQLite, diário)
+    roda no `executor` (io_executor() por padrão), então várias importações
+    podem dividir o mesmo loop. Cada linha tenta ISRC, índice global e cache
+    antes de buscar (com as query_variants); abaixo de match_threshold vai
+    para revisão, senão entra na playlist em lotes de add_batch_size.
+    on_row_done(row, video_id) só vem depois que o lote foi aceito;
+    on_row_failed(row) recebe as linhas com erro. journal_path/resume,
+    track_store, limiter, search_pool, progress e metrics são opcionais (ver
+    ImportJournal, TrackStore, AdaptiveRateLimiter, SearchPool,
+    ImportProgress e RunMetrics).
+    Retorna (playlist_id, lista_not_found).
+    """
+    if not os.path.exists(headers_file):
+        raise FileNotFoundError(
+            f"Arquivo de headers '{headers_file}' não encontrado. "
+            f"Garanta que gerou o browser.json com 'ytmusicapi browser'."
+        )
+
+    import asyncio
+    loop = asyncio.get_running_loop()
+    executor = executor or io_executor()
+
+    async def blocking(fn, *args, **kwargs):
+        return await loop.run_in_executor(executor, partial(fn, *args, **kwargs))
+
+    yt = await blocking(get_ytmusic, headers_file)
+    metrics = metrics or RunMetrics(parent=PROCESS_METRICS)
+
+    async def write(fn, *args, **kwargs):
+        # add/flush do escritor só bloqueiam com a fila de lotes cheia;
+        # nesse caso esperam fora do loop
+        if writer.backlogged:
+            return await blocking(fn, *args, **kwargs)
+        return fn(*args, **kwargs)
+
+    done_rows = {}
+    resuming = False
+    if journal_path and resume:
+        start, done_rows = await blocking(ImportJournal.load, journal_path)
+        if start and not start.get("done") and start.get("playlist_id"):
+            resuming = True
+            playlist_id = start["playlist_id"]
+            # linhas que deram erro (rede, escrita recusada) são refeitas
+            done_rows = {idx: r for idx, r in done_rows.items() if r.get("status") != "error"}
+            log(f"\n⏯️ Retomando importação: {len(done_rows)} linha(s) já processadas.")
+            # o que já está na playlist não é reenviado (inclui o que foi
+            # adicionado depois do último fsync do diário)
+            existing = (await blocking(yt.get_playlist, playlist_id, limit=None)).get("tracks", [])
+            known_video_ids = set(known_video_ids or ()) | {t.get("videoId") for t in existing}
+        else:
+            log("\nNenhuma importação inacabada para retomar; começando do zero.")
+            done_rows = {}
+
+    if playlist_id:
+        log(f"\nAdicionando à playlist existente '{new_playlist_name}' (ID: {playlist_id})...")
+    else:
+        log(f"\nCriando playlist '{new_playlist_name}' no YouTube Music...")
+        with metrics.timer("yt.create_playlist"):
+            playlist_id = await blocking(
+                yt.create_playlist,
+                title=new_playlist_name,
+                description="Importada automaticamente a partir de uma playlist do Spotify.",
+            )
+        log(f"✅ Playlist criada! ID: {playlist_id}")
+
+    journal = None
+    if journal_path:
+        journal = ImportJournal(journal_path)
+        await blocking(journal.open, None if resuming else {"playlist_id": playlist_id, "name": new_playlist_name})
+    if track_store:
+        await blocking(track_store.set_meta, "playlist", {"playlist_id": playlist_id, "name": new_playlist_name})
+
+    unresolved = [0]  # linhas com erro nesta execução (o diário não é encerrado)
+
+    def record(idx, row, status, query, video_id=None, confidence=None):
+        # Linhas adicionadas viajam junto com o lote e só entram no diário e
+        # no armazém depois que ele foi enviado (on_flushed); as demais são
+        # gravadas na hora.
+        pos = row.get("_pos") if track_store else None
+        entry = (
+            {
+                "row": idx, "id": journal_row_id(row), "status": status, "query": query,
+                "video_id": video_id, "confidence": confidence,
+            }
+            if journal else None
+        )
+        if status == "added":
+            return (entry, pos, video_id, confidence, row) if journal or pos is not None or on_row_done else None
+        if status == "error":
+            unresolved[0] += 1
+        if journal and query is not None:
+            journal.write([entry])
+        if pos is not None:
+            track_store.record(pos, status, video_id, confidence)
+        return None
+
+    def on_flushed(payloads):
+        if journal:
+            journal.write([entry for entry, _, _, _, _ in payloads if entry])
+        for _, pos, video_id, confidence, row in payloads:
+            if pos is not None:
+                track_store.record(pos, "added", video_id, confidence)
+            if on_row_done:
+                on_row_done(row, video_id)
+
+    def on_failed(payloads):
+        # escrita recusada mesmo isolando o item: a linha fica como erro
+        unresolved[0] += len(payloads)
+        if journal:
+            journal.write([dict(entry, status="error") for entry, _, _, _, _ in payloads if entry])
+        for _, pos, video_id, confidence, row in payloads:
+            if pos is not None:
+                track_store.record(pos, "error", video_id, confidence)
+            if on_row_failed:
+                on_row_failed(row)
+
+    def close_outputs(completed: bool):
+        if journal:
+            journal.close(done=completed and not unresolved[0])
+        if track_store:
+            track_store.flush()
+
+    limiter = limiter or AdaptiveRateLimiter.from_delay(sleep_seconds)
+    if search_pool is None and search_profiles:
+        search_pool = await blocking(
+            SearchPool.from_headers, headers_file, limiter, search_profiles, sleep_seconds, log=log
+        )
+    if search_pool:
+        log(f"🔀 Buscas distribuídas entre {len(search_pool.profiles)} perfil(is).")
+
+    async def yt_search(query):
+        if search_pool:
+            return await search_pool.asearch(metrics, query, executor=executor, filter="songs")
+        return await limiter.atimed_call(metrics, "yt.search", yt.search, query, executor=executor, filter="songs")
+    writer = PlaylistWriter(
+        yt, playlist_id, log, batch_size=add_batch_size, limiter=limiter,
+        on_flushed=on_flushed, metrics=metrics, background=True, on_failed=on_failed,
+    )
+    if known_video_ids:
+        writer.mark_known(known_video_ids)
+    not_found = []
+    resumed_not_found = []  # não encontradas que o diário já tinha
+
+    # len() de um SpotifyTrackStream baixa a primeira página
+    total = await blocking(len, rows) if hasattr(rows, "__len__") else None
+    if on_progress_init and total is not None:
+        on_progress_init(total)
+    if progress:
+        progress.start(total)
+
+    def count_outcome(outcome: str):
+        metrics.inc(f"rows.{outcome}")
+        if progress:
+            progress.count(outcome)
+
+    def progress_step(outcome: str = None):
+        if outcome:
+            count_outcome(outcome)
+        if progress:
+            progress.step()
+        if on_progress_step:
+            on_progress_step()
+
+    seen_keys = set() if dedup else None
+    failed_rows = []
+    cache = await blocking(get_search_cache) if use_search_cache else None
+    variant_memo = {}  # consulta alternativa -> Future com os resultados (nesta execução)
+    variant_lock = threading.Lock()
+    variant_hits = [0]
+
+    def prepare_jobs():
+        # Dedup é decidido aqui, em ordem, antes de qualquer busca.
+        for idx, row in enumerate(rows):
+            artist = row.get("Artist", "").strip()
+            track = row.get("Track", "").strip()
+
+            if not artist and not track:
+                record(idx, row, "skipped", None)
+                yield idx, row, artist, track, None
+                continue
+
+            key = song_key(artist, track)
+            done = done_rows.get(idx)
+            if done and "id" in done and done["id"] != journal_row_id(row):
+                # a origem mudou desde o diário (faixas novas, removidas ou
+                # reordenadas): o índice não aponta mais para a mesma faixa,
+                # então nada dali em diante vale
+                log(f"⚠️ O diário não corresponde mais às linhas a partir da {idx + 1}ª; processando o resto de novo.")
+                done_rows.clear()
+                done = None
+            if done:
+                if dedup:
+                    seen_keys.add(key)
+                if done.get("status") in ("not_found", "review"):
+                    resumed_not_found.append(done["query"])
+                if track_store and row.get("_pos") is not None:
+                    # o armazém foi zerado pela nova leitura do Spotify:
+                    # repõe o desfecho que o diário já tinha
+                    track_store.record(row["_pos"], done.get("status"), done.get("video_id"), done.get("confidence"))
+                yield idx, row, artist, track, None
+                continue
+
+            if dedup and key in seen_keys:
+                log(f"  ↪️ Ignorando duplicata no CSV: {track} - {artist}")
+                record(idx, row, "skipped", None)
+                yield idx, row, artist, track, None
+                continue
+
+            if dedup:
+                seen_keys.add(key)
+
+            yield idx, row, artist, track, f"{artist} {track}"
+
+    async def search_job(job):
+        # Até search_workers ao mesmo tempo: busca + pontuação dos candidatos.
+        # Retorna (job, (candidato, confiança) ou None, erro).
+        if job[4] is None:
+            return job, None, None
+        with metrics.timer("row.resolve"):
+            return await resolve_job(job)
+
+    def lookup_indexes(isrc, song):
+        # 1) identificador exato: índice local ISRC -> videoId; 2) índice global
+        if isrc:
+            video_id = cache.lookup_isrc(isrc, metrics)
+            if video_id:
+                return {"videoId": video_id}, 1.0
+        stored = cache.lookup_song(song, metrics)
+        if stored and stored[1] >= match_threshold:
+            return {"videoId": stored[0]}, stored[1]
+        return None
+
+    def apply_writes(writes):
+        for write_fn in writes:
+            write_fn()
+
+    async def resolve_job(job):
+        _, row, artist, track, query = job
+        isrc = (row.get("ISRC") or "").strip()
+        if not cache:
+            try:
+                return job, await search_text(row, artist, track, query, isrc, []), None
+            except Exception as e:
+                return job, None, e
+
+        # a mesma música já resolvida nesta ou em outra migração (inclusive
+        # em paralelo) não é buscada de novo; consultas e gravações no SQLite
+        # saem do loop agrupadas, uma ida ao executor antes e outra depois
+        song = song_key(artist, track)
+
+        async def resolve():
+            stored = await blocking(lookup_indexes, isrc, song)
+            if stored:
+                return stored
+            writes = []
+            match = await search_text(row, artist, track, query, isrc, writes)
+            if match and match[1] >= match_threshold:
+                writes.append(partial(cache.remember_song, song, match[0]["videoId"], match[1]))
+            if writes:
+                await blocking(apply_writes, writes)
+            return match
+
+        try:
+            return job, await cache.resolve_once_async(song, resolve), None
+        except Exception as e:
+            return job, None, e
+
+    async def search_text(row, artist, track, query, isrc, writes):
+        # 3) busca textual completa; 4) cascata de variantes se não for confiável.
+        # Retorna (candidato, confiança) ou None; erros sobem se nada foi achado.
+        # As gravações no cache vão para `writes` (quem chama as aplica).
+        best, confidence = None, 0.0
+        attempts = chain(
+            [(SearchCache.make_key(artist, track), query)],
+            ((SearchCache.make_key("variant", q), q) for _, q in build_query_variants(artist, track, query_variants)),
+        )
+        for n, (cache_key, q) in enumerate(attempts):
+            try:
+                results, cached = await search_memo(cache_key, q, memoize=n > 0)
+            except Exception:
+                if best is None:
+                    raise
+                break
+            if not results:
+                continue
+            with metrics.timer("match"):
+                candidate, score = pick_best_match(row, results[:SEARCH_CACHE_TOP_N])
+            if candidate is None:
+                continue
+            if cache and cached is None:
+                writes.append(partial(cache.put, cache_key, results, video_id=candidate["videoId"]))
+            elif cache and cached[0] != candidate["videoId"]:
+                writes.append(partial(cache.set_video_id, cache_key, candidate["videoId"]))
+            if score > confidence or best is None:
+                best, confidence = candidate, score
+            if confidence >= match_threshold:
+                if n > 0:
+                    with variant_lock:
+                        variant_hits[0] += 1
+                break
+
+        if best is None:
+            return None
+        if cache and isrc and confidence >= match_threshold:
+            writes.append(partial(cache.remember_isrc, isrc, best["videoId"]))
+        return best, confidence
+
+    async def search_memo(cache_key, query, memoize: bool):
+        # Cache em disco primeiro; variantes também são memoizadas nesta
+        # execução, e linhas que compartilham a consulta esperam a mesma busca.
+        # Retorna (resultados, entrada do cache em disco ou None).
+        if cache:
+            cached = await blocking(cache.get, cache_key, metrics)
+            if cached is not None:
+                return cached[1], cached
+        if not memoize:
+            return await yt_search(query), None
+        with variant_lock:
+            future = variant_memo.get(cache_key)
+            owner = future is None
+            if owner:
+                future = variant_memo[cache_key] = Future()
+        if not owner:
+            return await asyncio.wrap_future(future), None
+        try:
+            results = await yt_search(query)
+        except Exception as e:
+            with variant_lock:
+                variant_memo.pop(cache_key, None)
+            future.set_exception(e)
+            raise
+        future.set_result([compact_search_result(r) for r in (results or [])[:SEARCH_CACHE_TOP_N]])
+        return results, None
+
+    async def handle_result(job, match, error, last_attempt: bool):
+        idx, row, artist, track, query = job
+        if error is not None:
+            if last_attempt:
+                not_found.append(query)
+                await blocking(record, idx, row, "error", query)
+                count_outcome("errors")
+                if on_row_failed:
+                    on_row_failed(row)
+                log(f"  ⚠️ Erro ao buscar '{query}': {error}")
+            else:
+                failed_rows.append(job)
+                log(f"  ⚠️ Erro ao buscar '{query}': {error} (nova tentativa no final)")
+            return
+        if match and match[1] >= match_threshold:
+            video_id = match[0]["videoId"]
+            await write(writer.add, video_id, query, payload=record(idx, row, "added", query, video_id, match[1]))
+            count_outcome("found")
+            log(f"  ✅ Encontrado ({match[1]:.2f}): {track} - {artist}")
+            return  # on_row_done vem do on_flushed, depois do envio do lote
+        if match:
+            candidate, confidence = match
+            artists = ", ".join(a.get("name", "") for a in candidate.get("artists") or [])
+            entry = f"{query}  [revisar: {candidate.get('title', '')} - {artists} | confiança {confidence:.2f}]"
+            not_found.append(entry)
+            await blocking(record, idx, row, "review", entry, candidate["videoId"], confidence)
+            count_outcome("review")
+            log(f"  🟡 Confiança baixa ({confidence:.2f}), enviado para revisão: {query}")
+        else:
+            not_found.append(query)
+            await blocking(record, idx, row, "not_found", query)
+            count_outcome("not_found")
+            log(f"  ❌ Não encontrado: {query}")
+        if on_row_done:
+            on_row_done(row, None)
+
+    completed = False
+    try:
+        # produtor (Spotify/CSV + dedup, na sua thread) -> buscas no loop ->
+        # escritor em lotes (na sua thread), ligados por filas limitadas
+        jobs = aprefetch(prepare_jobs(), PIPELINE_QUEUE_SIZE)
+        async with aclosing(aordered_map(search_job, jobs, search_workers)) as results:
+            async for job, match, error in results:
+                query = job[4]
+                if query is None:
+                    progress_step("skipped")
+                    continue
+
+                log(f"🔎 Buscando: {query}...")
+                try:
+                    await handle_result(job, match, error, last_attempt=False)
+                except Exception as e:
+                    log(f"  ⚠️ Erro ao adicionar '{query}': {e}")
+
+                progress_step()
+
+        if failed_rows:
+            log(f"\n🔁 Repetindo {len(failed_rows)} faixa(s) que falharam...")
+            for job in list(failed_rows):
+                try:
+                    await handle_result(*(await search_job(job)), last_attempt=True)
+                except Exception as e:
+                    log(f"  ⚠️ Erro ao adicionar '{job[4]}': {e}")
+
+        await blocking(writer.close)
+        completed = True
+        await blocking(close_outputs, True)
+    finally:
+        if not completed:
+            try:
+                writer.close()  # só encerra a thread; o erro original é o que importa
+            except Exception:
+                pass
+            close_outputs(False)
+    not_found[:0] = resumed_not_found
+    not_found.extend(writer.failed)
+    if progress:
+        progress.finish()
+
+    # retentativas, 429, cache e ejeções já foram contados em `metrics` onde
+    # aconteceram (limiter, cache e pool podem ser compartilhados); aqui só
+    # garante que os contadores apareçam, mesmo zerados
+    for name in ("yt.retries", "yt.throttled", "yt.throttle_wait_seconds"):
+        metrics.inc(name, 0)
+    if cache:
+        for name in ("cache.hits", "cache.misses", "cache.isrc_hits", "cache.song_hits"):
+            metrics.inc(name, 0)
+    metrics.inc("search.variant_hits", variant_hits[0])
+    metrics.inc("search.variant_queries", len(variant_memo))
 
-from spotipy import Spotify
-from spotipy.oauth2 import SpotifyOAuth
-from ytmusicapi import YTMusic
-from dotenv import load_dotenv
+    log("\n🎉 Importação concluída!")
+    log(f"Total adicionadas: {writer.added} ({writer.requests} requisição(ões) de escrita)")
+    if not_found:
+        log(f"Não encontradas: {len(not_found)}")
+    if cache:
+        log(
+            f"🗃️ Cache de buscas: {metrics.count('cache.hits')} acerto(s), "
+            f"{metrics.count('cache.misses')} falha(s); "
+            f"{metrics.count('cache.isrc_hits')} casada(s) direto pelo ISRC, "
+            f"{metrics.count('cache.song_hits')} já resolvida(s) no índice global."
+        )
+    if variant_hits[0]:
+        log(f"🔁 Buscas alternativas resolveram {variant_hits[0]} faixa(s) ({len(variant_memo)} busca(s) alternativa(s) nesta execução).")
+    log(f"⏱️ Ritmo YouTube Music: {limiter.stats()}")
+    if search_pool:
+        log(f"🔀 Perfis de busca: {search_pool.stats()}")
+        if metrics.count("search_pool.ejections"):
+            log(f"🚫 {metrics.count('search_pool.ejections')} ejeção(ões) de perfil nesta importação.")
+    if metrics_path:
+        metrics.write_json(metrics_path)
+        log(f"📊 Métricas salvas em: {metrics_path}")
 
-# -------------------------------------------------------------------
-# Configuração inicial
-# -------------------------------------------------------------------
+    return playlist_id, not_found
 
-load_dotenv()  # carrega .env com SPOTIPY_*
 
-CSV_DIR = "csv"
-os.makedirs(CSV_DIR, exist_ok=True)
+def import_tracks_to_ytmusic(rows, new_playlist_name: str, headers_file: str, sleep_seconds: float, log, **kwargs):
+    """
+    Versão síncrona de import_tracks_to_ytmusic_async (mesmos parâmetros),
+    para quem roda fora de um loop asyncio (GUI, CLI): roda a importação num
+    loop próprio na thread atual.
+    Retorna (playlist_id, lista_not_found).
+    """
+    return lazy_import("asyncio").run(
+        import_tracks_to_ytmusic_async(rows, new_playlist_name, headers_file, sleep_seconds, log, **kwargs)
+    )
 
-HEADERS_FILE_DEFAULT = "browser.json"
 
+async def import_csv_to_ytmusic_async(
+    csv_path: str, new_playlist_name: str, headers_file: str, sleep_seconds: float, log, **kwargs
+):
+    """
+    import_csv_to_ytmusic para asyncio: várias importações podem rodar no
+    mesmo loop, dividindo o io_executor().
+    Retorna (playlist_id, lista_not_found).
+    """
+    return await import_tracks_to_ytmusic_async(
+        CsvRowStream(csv_path), new_playlist_name, headers_file, sleep_seconds, log, **kwargs
+    )
 
-# -------------------------------------------------------------------
-# Helpers de backend (Spotify / YouTube)
-# -------------------------------------------------------------------
 
-def extract_playlist_id(playlist_id_or_url: str) -> str:
+def import_csv_to_ytmusic(csv_path: str, new_playlist_name: str, headers_file: str, sleep_seconds: float, log, **kwargs):
     """
-    Aceita tanto o ID puro quanto a URL da playlist do Spotify.
-    Ex:
-      - https://open.spotify.com/playlist/37i9dQZF1DXcBWIGoYBM5M
-        -> 37i9dQZF1DXcBWIGoYBM5M
+    Cria uma nova playlist no YouTube Music e importa as músicas do CSV.
+    Aceita os mesmos parâmetros opcionais de import_tracks_to_ytmusic.
+    Retorna (playlist_id, lista_not_found).
     """
-    if "open.spotify.com" in playlist_id_or_url:
-        parts = playlist_id_or_url.split("playlist/")
-        if len(parts) > 1:
-            return parts[1].split("?")[0]
-    return playlist_id_or_url.strip()
+    return import_tracks_to_ytmusic(CsvRowStream(csv_path), new_playlist_name, headers_file, sleep_seconds, log, **kwargs)
 
 
-def get_spotify_client() -> Spotify:
+def track_store_path(base_name: str) -> str:
+    """Caminho do TrackStore de uma migração (ao lado do CSV, em CSV_DIR)."""
+    return os.path.join(CSV_DIR, f"{base_name}.tracks.sqlite3")
+
+
+def retry_store_to_ytmusic(store_path: str, headers_file: str, sleep_seconds: float, log, **kwargs):
     """
-    Cria o cliente Spotify com os escopos necessários.
+    Repete só as linhas ainda não resolvidas de um TrackStore (não encontradas,
+    em revisão, com erro ou nunca processadas), adicionando na mesma playlist
+    da rodada anterior; o que já foi adicionado não é relido nem reenviado.
+    Aceita os mesmos parâmetros opcionais de import_tracks_to_ytmusic.
+    Retorna (playlist_id, lista_not_found).
     """
-    return Spotify(
-        auth_manager=SpotifyOAuth(
-            client_id=os.getenv("SPOTIPY_CLIENT_ID"),
-            client_secret=os.getenv("SPOTIPY_CLIENT_SECRET"),
-            redirect_uri=os.getenv("SPOTIPY_REDIRECT_URI"),
-            scope="playlist-read-private user-library-read",
+    if not os.path.exists(store_path):
+        raise FileNotFoundError(f"Armazém de faixas '{store_path}' não encontrado.")
+    store = TrackStore(store_path)
+    try:
+        playlist = store.get_meta("playlist")
+        if not playlist:
+            raise ValueError(f"'{store_path}' ainda não foi importado (sem playlist registrada).")
+        counts = store.status_counts()
+        log(f"\n🗂️ Armazém {store_path}: " + ", ".join(f"{k}={v}" for k, v in sorted(counts.items())))
+        return import_tracks_to_ytmusic(
+            store.unresolved(),
+            playlist["name"],
+            headers_file,
+            sleep_seconds,
+            log,
+            playlist_id=playlist["playlist_id"],
+            known_video_ids=store.video_ids(),
+            track_store=store,
+            **kwargs,
         )
-    )
+    finally:
+        store.close()
 
 
-def get_liked_tracks(sp: Spotify):
+class CsvRowStream:
     """
-    Retorna a lista de 'músicas curtidas' (saved tracks) do usuário.
+    Linhas de um CSV lidas sob demanda (o arquivo não é carregado inteiro).
+    len() conta os registros numa passada rápida, só para o progresso.
     """
-    results = sp.current_user_saved_tracks(limit=50)
-    tracks = results["items"]
 
-    while results["next"]:
-        results = sp.next(results)
-        tracks.extend(results["items"])
+    def __init__(self, csv_path: str):
+        self.csv_path = csv_path
+        self._len = None
 
-    return tracks
+    def __len__(self):
+        if self._len is None:
+            with open(self.csv_path, mode="r", encoding="utf-8", newline="") as file:
+                self._len = max(0, sum(1 for _ in csv.reader(file)) - 1)
+        return self._len
 
+    def __iter__(self):
+        with open(self.csv_path, mode="r", encoding="utf-8", newline="") as file:
+            yield from csv.DictReader(file)
 
-def export_spotify_playlist_to_csv(playlist_id_or_url: str, csv_path: str, log):
+
+def salvar_fallback_not_found(not_found_list, base_name: str, log):
     """
-    Exporta uma playlist NORMAL do Spotify para CSV (colunas: Artist, Track).
+    Salva as queries não encontradas em um .txt simples para você revisar depois.
     """
-    sp = get_spotify_client()
-    playlist_id = extract_playlist_id(playlist_id_or_url)
+    if not not_found_list:
+        return None
 
-    def get_playlist_tracks(pid):
-        results = sp.playlist_tracks(pid)
-        tracks_local = results["items"]
-        while results["next"]:
-            results = sp.next(results)
-            tracks_local.extend(results["items"])
-        return tracks_local
+    filename = f"{base_name}_not_found.txt"
+    with open(filename, "w", encoding="utf-8") as f:
+        for q in not_found_list:
+            f.write(q + "\n")
 
-    log(f"\nLendo playlist do Spotify ({playlist_id})...")
-    tracks = get_playlist_tracks(playlist_id)
-    log(f"Encontradas {len(tracks)} faixas. Salvando em CSV...")
+    log(f"📝 Arquivo de fallback salvo em '{filename}'.")
+    return filename
 
-    with open(csv_path, mode="w", newline="", encoding="utf-8") as file:
-        writer = csv.writer(file)
-        writer.writerow(["Artist", "Track"])  # cabeçalho
 
-        for item in tracks:
-            track = item.get("track")
-            if not track:
-                continue
-            artist_name = track["artists"][0]["name"]
-            track_name = track["name"]
-            writer.writerow([artist_name, track_name])
+# -------------------------------------------------------------------
+# Sincronização incremental
+# -------------------------------------------------------------------
 
-    log(f"✅ Exportação concluída! {len(tracks)} músicas salvas em '{csv_path}'.")
+def _sync_state_path(source_key: str) -> str:
+    return os.path.join(SYNC_STATE_DIR, f"{source_key}.json")
 
 
-def export_liked_songs_to_csv(csv_path: str, log):
+def load_sync_state(source_key: str):
     """
-    Exporta as MÚSICAS CURTIDAS do usuário para CSV.
+    Lê o estado salvo de uma origem ("liked" ou "playlist_<id>"), ou None.
     """
-    sp = get_spotify_client()
+    path = _sync_state_path(source_key)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
 
-    log("\nLendo MINHAS MÚSICAS CURTIDAS do Spotify...")
-    tracks = get_liked_tracks(sp)
-    log(f"Encontradas {len(tracks)} faixas curtidas. Salvando em CSV...")
 
-    with open(csv_path, mode="w", newline="", encoding="utf-8") as file:
-        writer = csv.writer(file)
-        writer.writerow(["Artist", "Track"])  # cabeçalho
+def save_sync_state(source_key: str, state: dict):
+    """
+    Grava o estado de forma atômica (arquivo temporário + replace).
+    """
+    os.makedirs(SYNC_STATE_DIR, exist_ok=True)
+    path = _sync_state_path(source_key)
+    state["updated_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
 
-        for item in tracks:
-            track = item.get("track")
-            if not track:
-                continue
-            artist_name = track["artists"][0]["name"]
-            track_name = track["name"]
-            writer.writerow([artist_name, track_name])
 
-    log(f"✅ Exportação concluída! {len(tracks)} músicas curtidas salvas em '{csv_path}'.")
+def remove_from_yt_playlist(yt, playlist_id: str, video_ids, log):
+    """
+    Remove da playlist do YT os vídeos informados (precisa do setVideoId,
+    que só vem do get_playlist).
+    """
+    video_ids = set(video_ids)
+    if not video_ids:
+        return 0
+    playlist = yt.get_playlist(playlist_id, limit=None)
+    videos = [
+        t for t in playlist.get("tracks", [])
+        if t.get("videoId") in video_ids and t.get("setVideoId")
+    ]
+    if videos:
+        yt.remove_playlist_items(playlist_id, videos)
+    log(f"🗑️ Removidas {len(videos)} faixa(s) da playlist no YouTube Music.")
+    return len(videos)
+
+
+def _run_sync(source_key, state, rows, removed_ids, yt_name, headers_file, sleep_seconds, log, **kwargs):
+    """
+    Aplica um delta numa playlist do YT: adiciona `rows`, remove `removed_ids`
+    e atualiza o mapeamento Spotify ID -> videoId do estado.
+    Linhas que falharam (busca ou escrita) ficam fora do mapeamento e são
+    guardadas em state["pending"] para a próxima sincronização; o snapshot_id
+    da playlist não é gravado, para o delta ser recalculado.
+    Só a importação completa (sem playlist no estado) é retomada pelo diário:
+    cada delta é uma lista nova de linhas, e o que falhou já volta em pending.
+    """
+    mapping = state.setdefault("tracks", {})
+    if state.get("playlist_id"):
+        kwargs["resume"] = False
+    failed = []
+
+    def on_row_done(row, video_id):
+        if row.get("SpotifyId"):
+            mapping[row["SpotifyId"]] = video_id
 
+    def on_row_failed(row):
+        if row.get("SpotifyId"):
+            failed.append({k: v for k, v in row.items() if not k.startswith("_")})
 
-def import_csv_to_ytmusic(
-    csv_path: str,
-    new_playlist_name: str,
+    if removed_ids:
+        gone = {mapping.pop(tid, None) for tid in removed_ids}
+        still_used = set(mapping.values())
+        yt = get_ytmusic(headers_file)
+        remove_from_yt_playlist(yt, state["playlist_id"], gone - still_used - {None}, log)
+
+    not_found = []
+    if rows or not state.get("playlist_id"):
+        state["playlist_id"], not_found = import_tracks_to_ytmusic(
+            rows,
+            yt_name,
+            headers_file,
+            sleep_seconds,
+            log,
+            playlist_id=state.get("playlist_id"),
+            known_video_ids=set(mapping.values()),
+            on_row_done=on_row_done,
+            on_row_failed=on_row_failed,
+            **kwargs,
+        )
+
+    state["pending"] = [row for row in failed if row["SpotifyId"] not in mapping]
+    if state["pending"]:
+        state.pop("snapshot_id", None)
+        log(f"⚠️ {len(state['pending'])} faixa(s) com erro serão tentadas na próxima sincronização.")
+    save_sync_state(source_key, state)
+    return state["playlist_id"], not_found
+
+
+def sync_liked_to_ytmusic(
+    yt_name: str,
     headers_file: str,
     sleep_seconds: float,
     log,
-    dedup: bool = True,
-    on_progress_init=None,
-    on_progress_step=None,
+    csv_path: str = None,
+    spotify_limiter_: AdaptiveRateLimiter = None,
+    **kwargs,
 ):
     """
-    Cria uma nova playlist no YouTube Music e importa as músicas do CSV.
-    Usa autenticação baseada em headers.
+    Sincronização incremental das MÚSICAS CURTIDAS.
+    Na primeira execução importa tudo e guarda o estado; nas seguintes lê
+    só as curtidas a partir da marca d'água (added_at; as do mesmo segundo são
+    filtradas pelo Spotify ID) e as adiciona à mesma playlist, junto com as
+    que falharam na execução anterior (state["pending"]). Remoções só são
+    procuradas quando o total do Spotify não bate com o esperado.
+    spotify_limiter_ permite dividir o ritmo do Spotify com outras migrações.
+    Aceita os parâmetros opcionais de import_tracks_to_ytmusic.
     Retorna (playlist_id, lista_not_found).
     """
-    if not os.path.exists(headers_file):
-        raise FileNotFoundError(
-            f"Arquivo de headers '{headers_file}' não encontrado. "
-            f"Garanta que gerou o browser.json com 'ytmusicapi browser'."
-        )
+    source_key = "liked"
+    limiter = spotify_limiter_ or spotify_limiter()
+    state = load_sync_state(source_key)
+    if not state or not state.get("playlist_id"):
+        log("\n🔁 Sincronização: nenhum estado salvo, fazendo importação completa.")
+        state = {"source": source_key}
+        rows = stream_liked_songs(log, csv_path, limiter=limiter, metrics=kwargs.get("metrics"))
+        watermark = None
+        total = len(rows)
+        if rows.first_page()["items"]:
+            watermark = rows.first_page()["items"][0].added_at
+        state.update(watermark=watermark, total=total)
+        return _run_sync(source_key, state, rows, [], yt_name, headers_file, sleep_seconds, log, **kwargs)
+
+    sp = get_spotify_client()
+    watermark = state.get("watermark") or ""
+    log(f"\n🔁 Sincronizando curtidas adicionadas depois de {watermark or '(início)'}...")
+
+    # As curtidas vêm da mais nova para a mais antiga: para antes da marca
+    # d'água. Curtidas do mesmo segundo dela são relidas e filtradas pelo ID.
+    fetch_page = liked_tracks_fetcher(sp, limiter, kwargs.get("metrics"))
+    first = fetch_page(0)
+    new_items = []
+    for page in iter_pages(fetch_page, first):
+        older = [i for i in page["items"] if (i.added_at or "") < watermark]
+        new_items.extend(i for i in page["items"] if (i.added_at or "") >= watermark)
+        if older:
+            break
+
+    known = state.get("tracks", {})
+    pending = [row for row in state.get("pending", []) if row["SpotifyId"] not in known]
+    pending_ids = {row["SpotifyId"] for row in pending}
+    fresh = [i for i in new_items if i.empty or (i.id not in known and i.id not in pending_ids)]
+
+    removed_ids = []
+    expected_total = state.get("total", 0) + len(fresh)
+    if first["total"] != expected_total:
+        log("Total de curtidas mudou além das novas; procurando faixas removidas...")
+        current_ids = {item.id for item in iter_liked_tracks(sp, limiter=limiter)}
+        removed_ids = [tid for tid in known if tid not in current_ids]
+        pending = [row for row in pending if row["SpotifyId"] in current_ids]
+
+    rows = [row for row in map(spotify_item_to_row, fresh) if row] + pending
+    log(f"Delta: {len(rows)} nova(s), {len(removed_ids)} removida(s).")
+
+    if first["items"]:
+        state["watermark"] = max(watermark, first["items"][0].added_at or "")
+    state["total"] = first["total"]
+    return _run_sync(source_key, state, rows, removed_ids, yt_name, headers_file, sleep_seconds, log, **kwargs)
+
+
+def sync_playlist_to_ytmusic(
+    playlist_id_or_url: str,
+    yt_name: str,
+    headers_file: str,
+    sleep_seconds: float,
+    log,
+    csv_path: str = None,
+    spotify_limiter_: AdaptiveRateLimiter = None,
+    **kwargs,
+):
+    """
+    Sincronização incremental de uma playlist NORMAL do Spotify.
+    Se o snapshot_id não mudou desde a última execução, não faz nada; senão
+    compara os IDs atuais com os já sincronizados e aplica só o delta.
+    spotify_limiter_ permite dividir o ritmo do Spotify com outras migrações.
+    Aceita os parâmetros opcionais de import_tracks_to_ytmusic.
+    Retorna (playlist_id, lista_not_found).
+    """
+    sp = get_spotify_client()
+    playlist_id = extract_playlist_id(playlist_id_or_url)
+    source_key = f"playlist_{playlist_id}"
+    limiter = spotify_limiter_ or spotify_limiter()
+    snapshot_id = limiter.call(sp.playlist, playlist_id, fields="snapshot_id")["snapshot_id"]
 
-    yt = YTMusic(headers_file)
+    state = load_sync_state(source_key)
+    if not state or not state.get("playlist_id"):
+        log("\n🔁 Sincronização: nenhum estado salvo, fazendo importação completa.")
+        state = {"source": source_key, "snapshot_id": snapshot_id}
+        rows = stream_spotify_playlist(playlist_id, log, csv_path, limiter=limiter, metrics=kwargs.get("metrics"))
+        return _run_sync(source_key, state, rows, [], yt_name, headers_file, sleep_seconds, log, **kwargs)
 
-    log(f"\nCriando playlist '{new_playlist_name}' no YouTube Music...")
-    playlist_id = yt.create_playlist(
-        title=new_playlist_name,
-        description="Importada automaticamente a partir de uma playlist do Spotify.",
-    )
-    log(f"✅ Playlist criada! ID: {playlist_id}")
+    if state.get("snapshot_id") == snapshot_id:
+        log(f"\n🔁 Playlist {playlist_id} sem alterações desde a última sincronização.")
+        return state["playlist_id"], []
 
-    added = 0
-    not_found = []
+    log(f"\n🔁 Playlist {playlist_id} mudou; calculando delta...")
+    known = state.get("tracks", {})
+    rows = [row for row in map(spotify_item_to_row, iter_playlist_tracks(sp, playlist_id, limiter=limiter)) if row]
+    current_ids = {row["SpotifyId"] for row in rows}
+    removed_ids = [tid for tid in known if tid not in current_ids]
+    rows = [row for row in rows if row["SpotifyId"] not in known]
+    log(f"Delta: {len(rows)} nova(s), {len(removed_ids)} removida(s).")
 
-    with open(csv_path, mode="r", encoding="utf-8") as file:
-        reader = csv.DictReader(file)
-        rows = list(reader)
+    state["snapshot_id"] = snapshot_id
+    return _run_sync(source_key, state, rows, removed_ids, yt_name, headers_file, sleep_seconds, log, **kwargs)
 
-    total = len(rows)
-    if on_progress_init:
-        on_progress_init(total)
 
-    seen_keys = set() if dedup else None
+# -------------------------------------------------------------------
+# CLI (modo headless)
+# -------------------------------------------------------------------
+
+class JsonLinesReporter:
+    """
+    Emite eventos como JSON lines (um objeto por linha) em vez de callbacks
+    de GUI. Seguro para várias migrações rodando em paralelo.
+    """
 
-    for row in rows:
-        artist = row.get("Artist", "").strip()
-        track = row.get("Track", "").strip()
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self._lock = threading.Lock()
+
+    def emit(self, event: str, **fields):
+        record = {"ts": round(time.time(), 3), "event": event, **fields}
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+    def job_callbacks(self, job: str, interval: float = 1.0) -> dict:
+        """
+        log e progress (ImportProgress) ligados a um job do manifesto. O
+        progresso sai como eventos "progress" agregados, no máximo um por
+        `interval` segundos, em vez de um por faixa.
+        """
+        return dict(
+            log=lambda text: self.emit("log", job=job, message=text.strip()),
+            progress=ImportProgress(
+                on_report=lambda snapshot: self.emit("progress", job=job, **snapshot), interval=interval
+            ),
+        )
 
-        if not artist and not track:
-            if on_progress_step:
-                on_progress_step()
-            continue
 
-        key = (artist.lower(), track.lower())
-        if dedup and key in seen_keys:
-            log(f"  ↪️ Ignorando duplicata no CSV: {track} - {artist}")
-            if on_progress_step:
-                on_progress_step()
-            continue
+def load_manifest(path: str) -> dict:
+    """
+    Lê o manifesto JSON de uma migração em lote. Formato:
+      {
+        "headers": "browser.json", "delay": 0.6, "workers": 4, "parallel": 2,
+        "min_confidence": 0.6, "query_variants": ["clean", "primary_artist"],
+        "metrics_port": 9464, "search_profiles": ["perfil2.json", "perfil3.json"],
+        "playlists": [
+          {"source": "https://open.spotify.com/playlist/...", "name": "rock"},
+          {"source": "liked", "name": "liked_songs", "incremental": true}
+        ]
+      }
+    Cada item aceita ainda "yt_name", "dedup", "incremental" e "resume".
+    Opções passadas na linha de comando têm prioridade sobre o manifesto.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    for item in manifest.get("playlists", []):
+        if "source" not in item:
+            raise ValueError(f"Item do manifesto sem 'source': {item}")
+        item.setdefault(
+            "name", "liked_songs" if item["source"] == "liked" else extract_playlist_id(item["source"])
+        )
+    return manifest
 
-        if dedup:
-            seen_keys.add(key)
 
-        query = f"{artist} {track}"
+def run_manifest_job(
+    item: dict, settings: dict, yt_limiter, spotify_limiter_, reporter: JsonLinesReporter, search_pool=None
+):
+    """
+    Migra um item do manifesto (playlist ou "liked"). Retorna (playlist_id, not_found).
+    """
+    name = item["name"]
+    callbacks = reporter.job_callbacks(name)
+    log = callbacks["log"]
+    csv_path = os.path.join(CSV_DIR, f"{name}.csv")
+    yt_name = item.get("yt_name", name)
+    options = dict(
+        dedup=item.get("dedup", settings["dedup"]),
+        progress=callbacks["progress"],
+        search_workers=settings["workers"],
+        add_batch_size=settings["batch_size"],
+        match_threshold=settings["min_confidence"],
+        query_variants=settings["query_variants"],
+        journal_path=os.path.join(CSV_DIR, f"{name}.journal.jsonl"),
+        resume=item.get("resume", settings["resume"]),
+        limiter=yt_limiter,
+        metrics=RunMetrics(parent=PROCESS_METRICS),
+        metrics_path=os.path.join(CSV_DIR, f"{name}.metrics.json"),
+        search_pool=search_pool,
+    )
+    liked = item["source"] == "liked"
 
-        log(f"🔎 Buscando: {query}...")
+    if item.get("incremental", settings["incremental"]):
+        if liked:
+            result = sync_liked_to_ytmusic(
+                yt_name, settings["headers"], settings["delay"], log, csv_path=csv_path,
+                spotify_limiter_=spotify_limiter_, **options
+            )
+        else:
+            result = sync_playlist_to_ytmusic(
+                item["source"], yt_name, settings["headers"], settings["delay"], log, csv_path=csv_path,
+                spotify_limiter_=spotify_limiter_, **options
+            )
+    else:
+        store = TrackStore(track_store_path(name))
         try:
-            results = yt.search(query, filter="songs")
-            if results:
-                video_id = results[0]["videoId"]
-                yt.add_playlist_items(playlist_id, [video_id])
-                added += 1
-                log(f"  ✅ Adicionado: {track} - {artist}")
+            if liked:
+                rows = stream_liked_songs(
+                    log, csv_path, limiter=spotify_limiter_, metrics=options["metrics"], store=store
+                )
             else:
-                not_found.append(query)
-                log(f"  ❌ Não encontrado: {query}")
+                rows = stream_spotify_playlist(
+                    item["source"], log, csv_path, limiter=spotify_limiter_, metrics=options["metrics"], store=store
+                )
+            result = import_tracks_to_ytmusic(
+                rows, yt_name, settings["headers"], settings["delay"], log, track_store=store, **options
+            )
+        finally:
+            store.close()
+
+    salvar_fallback_not_found(result[1], name, log)
+    return result
+
+
+def run_manifest(manifest: dict, settings: dict, reporter: JsonLinesReporter) -> int:
+    """
+    Roda todas as migrações do manifesto, até settings["parallel"] ao mesmo
+    tempo, dividindo os mesmos controles de ritmo (YT e Spotify) e o mesmo
+    pool de perfis de busca (settings["search_profiles"]).
+    Retorna o número de jobs que falharam.
+    """
+    yt_limiter = AdaptiveRateLimiter.from_delay(settings["delay"])
+    sp_limiter = spotify_limiter()
+    search_pool = None
+    if settings["search_profiles"]:
+        search_pool = SearchPool.from_headers(
+            settings["headers"], yt_limiter, settings["search_profiles"], settings["delay"],
+            log=lambda text: reporter.emit("log", message=text),
+        )
+    items = manifest.get("playlists", [])
+    reporter.emit("start", jobs=[item["name"] for item in items])
 
-            time.sleep(sleep_seconds)  # evita rate limit
+    def run(item):
+        reporter.emit("job_start", job=item["name"], source=item["source"])
+        try:
+            playlist_id, not_found = run_manifest_job(item, settings, yt_limiter, sp_limiter, reporter, search_pool)
         except Exception as e:
-            log(f"  ⚠️ Erro ao adicionar '{query}': {e}")
+            reporter.emit("job_error", job=item["name"], error=str(e))
+            return False
+        reporter.emit("job_done", job=item["name"], playlist_id=playlist_id, not_found=len(not_found))
+        return True
+
+    with ThreadPoolExecutor(max_workers=max(1, settings["parallel"])) as pool:
+        ok = list(pool.map(run, items))
+
+    failures = ok.count(False)
+    reporter.emit(
+        "done",
+        jobs=len(items),
+        failed=failures,
+        yt_rate=round(yt_limiter.rate, 2),
+        yt_retries=yt_limiter.retries,
+        spotify_retries=sp_limiter.retries,
+    )
+    return failures
 
-        if on_progress_step:
-            on_progress_step()
 
-    log("\n🎉 Importação concluída!")
-    log(f"Total adicionadas: {added}")
-    if not_found:
-        log(f"Não encontradas: {len(not_found)}")
+def parse_query_variants(value) -> tuple:
+    """Lista de variantes ("clean,ascii" ou lista JSON) validada contra QUERY_VARIANTS."""
+    names = value.split(",") if isinstance(value, str) else list(value)
+    names = tuple(n.strip() for n in names if n.strip())
+    unknown = [n for n in names if n not in QUERY_VARIANTS]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"variante(s) desconhecida(s): {', '.join(unknown)}")
+    return names
 
-    return playlist_id, not_found
 
+def parse_search_profiles(value) -> tuple:
+    """Lista de browser.json extras ("a.json,b.json" ou lista JSON)."""
+    names = value.split(",") if isinstance(value, str) else list(value)
+    return tuple(n.strip() for n in names if n.strip())
 
-def salvar_fallback_not_found(not_found_list, base_name: str, log):
-    """
-    Salva as queries não encontradas em um .txt simples para você revisar depois.
-    """
-    if not not_found_list:
-        return None
 
-    filename = f"{base_name}_not_found.txt"
-    with open(filename, "w", encoding="utf-8") as f:
-        for q in not_found_list:
-            f.write(q + "\n")
+def build_cli_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="spotify_ytmusic_sync.py",
+        description="Spotify → YouTube Music. Sem argumentos, abre a GUI.",
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def add_import_args(p, defaults: bool = True):
+        # sem defaults (migrate), o que não vier na linha de comando sai do manifesto
+        def d(value):
+            return value if defaults else None
+
+        p.add_argument("--headers", default=d(HEADERS_FILE_DEFAULT), help="arquivo browser.json do YT Music")
+        p.add_argument("--delay", type=float, default=d(0.6), help="intervalo inicial entre requisições (s)")
+        p.add_argument("--workers", type=int, default=d(SEARCH_WORKERS_DEFAULT), help="buscas simultâneas")
+        p.add_argument(
+            "--batch-size", type=int, default=d(ADD_BATCH_SIZE_DEFAULT), help="faixas por lote ao adicionar"
+        )
+        p.add_argument(
+            "--min-confidence",
+            type=float,
+            default=d(MATCH_CONFIDENCE_DEFAULT),
+            help="confiança mínima (0-1) para adicionar; abaixo disso a faixa vai para revisão",
+        )
+        p.add_argument(
+            "--query-variants",
+            type=parse_query_variants,
+            default=d(QUERY_VARIANTS_DEFAULT),
+            help=f"buscas alternativas, em ordem, separadas por vírgula ({','.join(QUERY_VARIANTS)}); vazio desativa",
+        )
+        p.add_argument(
+            "--search-profiles",
+            type=parse_search_profiles,
+            default=d(()),
+            help="browser.json extras, separados por vírgula, para dividir as buscas (as escritas ficam no --headers)",
+        )
+        p.add_argument(
+            "--no-dedup", dest="dedup", action="store_false", default=d(True), help="desativa a deduplicação"
+        )
+        p.add_argument(
+            "--metrics-port",
+            type=int,
+            default=None,
+            help="expõe as métricas no formato do Prometheus em http://127.0.0.1:PORTA/metrics",
+        )
 
-    log(f"📝 Arquivo de fallback salvo em '{filename}'.")
-    return filename
+    p = sub.add_parser("export-playlist", help="exporta uma playlist do Spotify para CSV")
+    p.add_argument("playlist", help="URL ou ID da playlist")
+    p.add_argument("csv", help="caminho do CSV de saída")
+
+    p = sub.add_parser("export-liked", help="exporta as músicas curtidas para CSV")
+    p.add_argument("csv", help="caminho do CSV de saída")
+
+    p = sub.add_parser("import", help="importa um CSV (Artist, Track) para uma nova playlist no YT Music")
+    p.add_argument("csv", help="CSV de entrada")
+    p.add_argument("name", help="nome da playlist no YT Music")
+    p.add_argument("--resume", action="store_true", help="retoma uma importação interrompida")
+    add_import_args(p)
+
+    p = sub.add_parser("retry", help="repete só as faixas não resolvidas de uma migração anterior")
+    p.add_argument("store", help="armazém de faixas (csv/<nome>.tracks.sqlite3)")
+    add_import_args(p)
+
+    p = sub.add_parser("migrate", help="migra várias playlists descritas num manifesto JSON")
+    p.add_argument("manifest", help="arquivo JSON (ver load_manifest)")
+    p.add_argument("--parallel", type=int, default=None, help="migrações simultâneas")
+    p.add_argument("--incremental", action="store_true", default=None, help="sincronização incremental")
+    p.add_argument("--resume", action="store_true", default=None, help="retoma migrações interrompidas")
+    add_import_args(p, defaults=False)
+
+    return parser
+
+
+def cli_main(argv) -> int:
+    """
+    Ponto de entrada headless: não importa Tkinter e emite JSON lines no stdout.
+    """
+    args = build_cli_parser().parse_args(argv)
+    reporter = JsonLinesReporter()
+
+    try:
+        manifest = load_manifest(args.manifest) if args.command == "migrate" else {}
+        metrics_port = getattr(args, "metrics_port", None) or manifest.get("metrics_port")
+        if metrics_port:
+            serve_metrics(metrics_port)
+            reporter.emit("metrics_endpoint", url=f"http://127.0.0.1:{metrics_port}/metrics")
+
+        if args.command == "export-playlist":
+            export_spotify_playlist_to_csv(args.playlist, args.csv, reporter.job_callbacks(args.csv)["log"])
+        elif args.command == "export-liked":
+            export_liked_songs_to_csv(args.csv, reporter.job_callbacks(args.csv)["log"])
+        elif args.command == "import":
+            callbacks = reporter.job_callbacks(args.name)
+            base_name = os.path.splitext(args.csv)[0]
+            playlist_id, not_found = import_csv_to_ytmusic(
+                args.csv,
+                args.name,
+                args.headers,
+                args.delay,
+                dedup=args.dedup,
+                search_workers=args.workers,
+                add_batch_size=args.batch_size,
+                match_threshold=args.min_confidence,
+                query_variants=args.query_variants,
+                search_profiles=args.search_profiles,
+                journal_path=f"{base_name}.journal.jsonl",
+                resume=args.resume,
+                metrics_path=f"{base_name}.metrics.json",
+                **callbacks,
+            )
+            salvar_fallback_not_found(not_found, base_name, callbacks["log"])
+            reporter.emit("done", playlist_id=playlist_id, not_found=len(not_found))
+        elif args.command == "retry":
+            base_name = args.store[: -len(".tracks.sqlite3")] if args.store.endswith(".tracks.sqlite3") else args.store
+            callbacks = reporter.job_callbacks(os.path.basename(base_name))
+            playlist_id, not_found = retry_store_to_ytmusic(
+                args.store,
+                args.headers,
+                args.delay,
+                dedup=args.dedup,
+                search_workers=args.workers,
+                add_batch_size=args.batch_size,
+                match_threshold=args.min_confidence,
+                query_variants=args.query_variants,
+                search_profiles=args.search_profiles,
+                metrics_path=f"{base_name}.metrics.json",
+                **callbacks,
+            )
+            salvar_fallback_not_found(not_found, os.path.basename(base_name), callbacks["log"])
+            reporter.emit("done", playlist_id=playlist_id, not_found=len(not_found))
+        elif args.command == "migrate":
+
+            def pick(cli_value, key, default):
+                return cli_value if cli_value is not None else manifest.get(key, default)
+
+            settings = dict(
+                headers=pick(args.headers, "headers", HEADERS_FILE_DEFAULT),
+                delay=pick(args.delay, "delay", 0.6),
+                workers=pick(args.workers, "workers", SEARCH_WORKERS_DEFAULT),
+                batch_size=pick(args.batch_size, "batch_size", ADD_BATCH_SIZE_DEFAULT),
+                min_confidence=pick(args.min_confidence, "min_confidence", MATCH_CONFIDENCE_DEFAULT),
+                query_variants=parse_query_variants(
+                    pick(args.query_variants, "query_variants", QUERY_VARIANTS_DEFAULT)
+                ),
+                search_profiles=parse_search_profiles(pick(args.search_profiles, "search_profiles", ())),
+                dedup=pick(args.dedup, "dedup", True),
+                parallel=pick(args.parallel, "parallel", 2),
+                incremental=pick(args.incremental, "incremental", False),
+                resume=pick(args.resume, "resume", False),
+            )
+            return 1 if run_manifest(manifest, settings, reporter) else 0
+    except Exception as e:
+        reporter.emit("error", error=str(e))
+        return 1
+    return 0
 
 
 # -------------------------------------------------------------------
 # GUI
 # -------------------------------------------------------------------
 
+class LogBuffer:
+    """
+    Buffer circular (thread-safe) das mensagens de log da GUI.
+    Qualquer thread chama append(); a thread da GUI chama drain() a cada tick
+    e insere tudo de uma vez. Se a GUI atrasar, as mensagens mais antigas são
+    descartadas (contadas em `dropped`), mas todas vão para o arquivo rotativo.
+    """
+
+    def __init__(self, max_lines: int = LOG_BUFFER_MAX_LINES, path: str = LOG_FILE):
+        self._lines = deque(maxlen=max_lines)
+        self._lock = threading.Lock()
+        self._dropped = 0
+        self._file_log = None
+        if path:
+            ensure_parent_dir(path)
+            handler = lazy_import("logging.handlers").RotatingFileHandler(
+                path, maxBytes=LOG_FILE_MAX_BYTES, backupCount=LOG_FILE_BACKUPS,
+                encoding="utf-8", delay=True,
+            )
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            self._file_log = logging.getLogger(f"{__name__}.gui")
+            self._file_log.propagate = False
+            self._file_log.setLevel(logging.INFO)
+            self._file_log.handlers[:] = [handler]
+
+    def append(self, text: str):
+        with self._lock:
+            if len(self._lines) == self._lines.maxlen:
+                self._dropped += 1
+            self._lines.append(text)
+        if self._file_log:
+            self._file_log.info(text)
+
+    def drain(self):
+        """Retorna (mensagens pendentes, quantas foram descartadas) e esvazia o buffer."""
+        with self._lock:
+            lines = list(self._lines)
+            self._lines.clear()
+            dropped, self._dropped = self._dropped, 0
+        return lines, dropped
+
+
+class DebouncedSearch:
+    """
+    Busca "enquanto digita" com uma única thread de trabalho.
+    submit(query) substitui o pedido pendente e só dispara a busca depois de
+    `delay` segundos sem novos pedidos; o resultado de uma busca que ficou
+    velha (chegou outro pedido enquanto ela rodava) é descartado em vez de
+    entregue. on_results(generation, query, results) e on_error(generation,
+    query, erro) rodam na thread de trabalho; is_current(generation) diz se
+    ainda é o pedido mais recente.
+    """
+
+    def __init__(self, search, on_results, on_error=None, delay: float = MANUAL_SEARCH_DEBOUNCE):
+        self.search = search
+        self.on_results = on_results
+        self.on_error = on_error
+        self.delay = delay
+        self._cond = threading.Condition()
+        self._generation = 0
+        self._pending = None  # (generation, query, instante para disparar)
+        self._thread = None
+
+    def submit(self, query: str, delay: float = None) -> int:
+        with self._cond:
+            self._generation += 1
+            wait = self.delay if delay is None else delay
+            self._pending = (self._generation, query, time.monotonic() + wait)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._cond.notify()
+            return self._generation
+
+    def cancel(self):
+        """Descarta o pedido pendente e o resultado da busca em andamento."""
+        with self._cond:
+            self._generation += 1
+            self._pending = None
+
+    def is_current(self, generation: int) -> bool:
+        with self._cond:
+            return generation == self._generation
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._pending is None:
+                        self._cond.wait()
+                        continue
+                    remaining = self._pending[2] - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                generation, query, _ = self._pending
+                self._pending = None
+            try:
+                results = self.search(query)
+            except Exception as e:
+                if self.on_error and self.is_current(generation):
+                    self.on_error(generation, query, e)
+                continue
+            if self.is_current(generation):
+                self.on_results(generation, query, results)
+
+
 class SpotifyYtMusicApp:
-    def __init__(self, root):
+    def __init__(self, root, startup_timing: bool = False):
         self.root = root
+        self.startup_timing = startup_timing
         self.root.title("Spotify → YouTube Music")
         self.root.geometry("850x650")
 
@@ -251,18 +3494,37 @@ class SpotifyYtMusicApp:
         self.headers_file = tk.StringVar(value=HEADERS_FILE_DEFAULT)
         self.sleep_seconds = tk.DoubleVar(value=0.6)
         self.dedup_var = tk.BooleanVar(value=True)
+        self.search_workers = tk.IntVar(value=SEARCH_WORKERS_DEFAULT)
+        self.add_batch_size = tk.IntVar(value=ADD_BATCH_SIZE_DEFAULT)
+        self.min_confidence = tk.DoubleVar(value=MATCH_CONFIDENCE_DEFAULT)
+        self.query_variants_var = tk.BooleanVar(value=True)
+        self.search_profiles_var = tk.StringVar(value="")
+        self.incremental_var = tk.BooleanVar(value=False)
+        self.resume_var = tk.BooleanVar(value=False)
 
         self.last_playlist_id = None
         self.last_playlist_name = None
         self.last_fallback_file = None
 
+        # Busca manual: resultados completos mostrados na lista (o índice da
+        # seleção aponta direto para eles) e a busca "enquanto digita"
+        self.manual_results = []
+        self._manual_headers = None
+        self._manual_logged_generation = None
+        self.manual_search = DebouncedSearch(
+            self._manual_search_query,
+            on_results=lambda gen, q, results: self.root.after(0, lambda: self._show_manual_results(gen, q, results)),
+            on_error=lambda gen, q, e: self.root.after(0, lambda: self._show_manual_error(q, e)),
+        )
+
         # log
-        self.log_queue = []
+        self.log_buffer = LogBuffer()
 
         # progresso
         self.progress_var = tk.IntVar(value=0)
         self.progress_max = tk.IntVar(value=1)
         self.progress_label_text = tk.StringVar(value="Progresso: 0 / 0")
+        self.progress = None  # ImportProgress da importação atual (lido por polling)
 
         # animação
         self.status_text = tk.StringVar(value="Pronto.")
@@ -272,6 +3534,11 @@ class SpotifyYtMusicApp:
 
         self._build_ui()
         self._schedule_log_update()
+        self._schedule_progress_update()
+        # clientes (spotipy/ytmusicapi) carregam em segundo plano depois que
+        # a janela aparece
+        self.root.bind("<Map>", self._on_first_map, add="+")
+        self._mapped = False
 
     # ------------------- tema -------------------
 
@@ -531,7 +3798,10 @@ class SpotifyYtMusicApp:
         # Campo de busca
         ttk.Label(frm, text="Buscar (artista + música):").grid(row=2, column=0, sticky="w")
         self.manual_query_var = tk.StringVar()
-        ttk.Entry(frm, textvariable=self.manual_query_var, width=40).grid(row=2, column=1, sticky="w")
+        self.manual_query_var.trace_add("write", lambda *_: self._on_manual_query_changed())
+        manual_entry = ttk.Entry(frm, textvariable=self.manual_query_var, width=40)
+        manual_entry.grid(row=2, column=1, sticky="w")
+        manual_entry.bind("<Return>", lambda _: self.on_manual_search())
 
         ttk.Button(frm, text="Buscar", command=self.on_manual_search).grid(row=2, column=2, padx=5)
 
@@ -583,7 +3853,7 @@ class SpotifyYtMusicApp:
         entry_headers.grid(row=0, column=1, sticky="w")
         ttk.Button(frm, text="Procurar...", command=self._browse_headers_file).grid(row=0, column=2, padx=5)
 
-        ttk.Label(frm, text="Delay entre requisições (segundos):").grid(
+        ttk.Label(frm, text="Delay inicial entre requisições (s, ajustado automaticamente):").grid(
             row=1, column=0, sticky="w", pady=(10, 0)
         )
         ttk.Entry(frm, textvariable=self.sleep_seconds, width=6).grid(
@@ -596,22 +3866,76 @@ class SpotifyYtMusicApp:
             variable=self.dedup_var,
         ).grid(row=2, column=0, columnspan=3, sticky="w", pady=(10, 0))
 
+        ttk.Label(frm, text="Buscas simultâneas (workers):").grid(
+            row=3, column=0, sticky="w", pady=(10, 0)
+        )
+        ttk.Entry(frm, textvariable=self.search_workers, width=6).grid(
+            row=3, column=1, sticky="w", pady=(10, 0)
+        )
+
+        ttk.Label(frm, text="Faixas por lote ao adicionar:").grid(
+            row=4, column=0, sticky="w", pady=(10, 0)
+        )
+        ttk.Entry(frm, textvariable=self.add_batch_size, width=6).grid(
+            row=4, column=1, sticky="w", pady=(10, 0)
+        )
+
+        ttk.Label(frm, text="Confiança mínima do match (0–1, abaixo vai para revisão):").grid(
+            row=5, column=0, sticky="w", pady=(10, 0)
+        )
+        ttk.Entry(frm, textvariable=self.min_confidence, width=6).grid(
+            row=5, column=1, sticky="w", pady=(10, 0)
+        )
+
+        ttk.Checkbutton(
+            frm,
+            text="Tentar buscas alternativas quando não achar (título limpo, artista principal, sem acentos, só título)",
+            variable=self.query_variants_var,
+        ).grid(row=6, column=0, columnspan=3, sticky="w", pady=(10, 0))
+
+        ttk.Checkbutton(
+            frm,
+            text="Sincronização incremental (reutiliza a playlist do YT e envia só o que mudou)",
+            variable=self.incremental_var,
+        ).grid(row=7, column=0, columnspan=3, sticky="w", pady=(10, 0))
+
+        ttk.Checkbutton(
+            frm,
+            text="Retomar importação interrompida (mesma playlist, pula o que já foi feito)",
+            variable=self.resume_var,
+        ).grid(row=8, column=0, columnspan=3, sticky="w", pady=(10, 0))
+
+        ttk.Label(frm, text="Perfis extras só para buscas (browser.json, separados por vírgula):").grid(
+            row=9, column=0, sticky="w", pady=(10, 0)
+        )
+        ttk.Entry(frm, textvariable=self.search_profiles_var, width=40).grid(
+            row=9, column=1, sticky="w", pady=(10, 0)
+        )
+        ttk.Button(frm, text="Adicionar...", command=self._browse_search_profile).grid(
+            row=9, column=2, padx=5, pady=(10, 0)
+        )
+
         frm.columnconfigure(1, weight=1)
 
     # ------------------- utilitários GUI -------------------
 
     def append_log(self, text: str):
         """Enfileira mensagem para ser exibida no Text em segurança."""
-        self.log_queue.append(text)
+        self.log_buffer.append(text)
 
     def _schedule_log_update(self):
-        """Atualiza o Text com as mensagens enfileiradas."""
-        if self.log_queue:
+        """Atualiza o Text com as mensagens enfileiradas (um insert por tick)."""
+        lines, dropped = self.log_buffer.drain()
+        if lines:
+            if dropped:
+                lines.insert(0, f"… {dropped} mensagem(ns) omitida(s) na tela (ver {LOG_FILE})")
             self.log_text.configure(state="normal")
-            while self.log_queue:
-                msg = self.log_queue.pop(0)
-                self.log_text.insert("end", msg + "\n")
-                self.log_text.see("end")
+            self.log_text.insert("end", "\n".join(lines) + "\n")
+            # mantém só as últimas LOG_WIDGET_MAX_LINES linhas no widget
+            excess = int(self.log_text.index("end-1c").split(".")[0]) - 1 - LOG_WIDGET_MAX_LINES
+            if excess > 0:
+                self.log_text.delete("1.0", f"{excess + 1}.0")
+            self.log_text.see("end")
             self.log_text.configure(state="disabled")
         self.root.after(100, self._schedule_log_update)
 
@@ -623,6 +3947,15 @@ class SpotifyYtMusicApp:
         if filename:
             self.headers_file.set(filename)
 
+    def _browse_search_profile(self):
+        filename = filedialog.askopenfilename(
+            title="Adicionar perfil de busca (outro browser.json)",
+            filetypes=[("JSON", "*.json"), ("Todos", "*.*")],
+        )
+        if filename:
+            current = parse_search_profiles(self.search_profiles_var.get())
+            self.search_profiles_var.set(",".join(current + (filename,)))
+
     def _open_csv_dir(self):
         if os.path.exists(CSV_DIR):
             try:
@@ -650,6 +3983,52 @@ class SpotifyYtMusicApp:
         t = threading.Thread(target=wrapper, daemon=True)
         t.start()
 
+    def _on_first_map(self, event):
+        if event.widget is not self.root or self._mapped:
+            return
+        self._mapped = True
+        STARTUP.mark("janela visível")
+        headers = self.headers_file.get()
+        threading.Thread(target=self._warm_up_clients, args=(headers,), daemon=True).start()
+
+    def _warm_up_clients(self, headers: str):
+        """Importa e cria os clientes antes do primeiro clique (na thread de fundo)."""
+        try:
+            get_http_session()
+            lazy_import("spotipy")
+            lazy_import("spotipy.oauth2")
+            load_env()
+            if os.path.exists(headers):
+                get_ytmusic(headers)
+            else:
+                lazy_import("ytmusicapi")
+        except Exception as e:
+            self.append_log(f"⚠️ Não foi possível pré-carregar os clientes: {e}")
+        STARTUP.mark("clientes prontos")
+        if self.startup_timing:
+            report = STARTUP.report()
+            self.append_log(report)
+            print(report, file=sys.stderr, flush=True)
+
+    def _import_options(self, base_name: str) -> dict:
+        """
+        Lê as opções de importação das variáveis Tk (na thread da GUI) e
+        devolve os kwargs comuns para import_tracks_to_ytmusic / sync_*.
+        """
+        return dict(
+            journal_path=os.path.join(CSV_DIR, f"{base_name}.journal.jsonl"),
+            resume=bool(self.resume_var.get()),
+            dedup=bool(self.dedup_var.get()),
+            progress=self._new_progress(),
+            metrics=RunMetrics(parent=PROCESS_METRICS),
+            metrics_path=os.path.join(CSV_DIR, f"{base_name}.metrics.json"),
+            search_workers=max(1, int(self.search_workers.get())),
+            add_batch_size=max(1, int(self.add_batch_size.get())),
+            match_threshold=min(1.0, max(0.0, float(self.min_confidence.get()))),
+            query_variants=QUERY_VARIANTS_DEFAULT if self.query_variants_var.get() else (),
+            search_profiles=parse_search_profiles(self.search_profiles_var.get()),
+        )
+
     # progresso
 
     def reset_progress(self, total: int):
@@ -660,12 +4039,22 @@ class SpotifyYtMusicApp:
         self.progress_var.set(0)
         self.progress_label_text.set(f"Progresso: 0 / {self.progress_max.get()}")
 
-    def step_progress(self):
-        current = self.progress_var.get() + 1
-        if current > self.progress_max.get():
-            current = self.progress_max.get()
-        self.progress_var.set(current)
-        self.progress_label_text.set(f"Progresso: {current} / {self.progress_max.get()}")
+    def _new_progress(self) -> ImportProgress:
+        """Cria o ImportProgress da próxima importação (as threads só incrementam)."""
+        self.progress = ImportProgress()
+        return self.progress
+
+    def _schedule_progress_update(self):
+        """Redesenha a barra a partir do ImportProgress atual, ~10 vezes por segundo."""
+        if self.progress is not None:
+            snapshot = self.progress.snapshot()
+            total = snapshot["total"] or max(snapshot["done"], 1)
+            if total != self.progress_max.get():
+                self.progress_max.set(total)
+                self.progressbar.configure(maximum=total)
+            self.progress_var.set(min(snapshot["done"], total))
+            self.progress_label_text.set(format_progress(snapshot))
+        self.root.after(100, self._schedule_progress_update)
 
     # animação
 
@@ -709,7 +4098,8 @@ class SpotifyYtMusicApp:
         csv_path = os.path.join(CSV_DIR, f"{csv_name}.csv")
         headers = self.headers_file.get()
         sleep = float(self.sleep_seconds.get())
-        dedup = bool(self.dedup_var.get())
+        incremental = bool(self.incremental_var.get())
+        options = self._import_options(csv_name)
 
         def job():
             self.root.after(0, lambda: self.start_animation("Migrando playlist..."))
@@ -720,18 +4110,30 @@ class SpotifyYtMusicApp:
             self.append_log(f"CSV: {csv_path}")
             self.append_log(f"Playlist YT: {yt_name}")
 
-            export_spotify_playlist_to_csv(playlist_url, csv_path, self.append_log)
-
-            playlist_id_yt, not_found = import_csv_to_ytmusic(
-                csv_path=csv_path,
-                new_playlist_name=yt_name,
-                headers_file=headers,
-                sleep_seconds=sleep,
-                log=self.append_log,
-                dedup=dedup,
-                on_progress_init=lambda total: self.root.after(0, lambda: self.reset_progress(total)),
-                on_progress_step=lambda: self.root.after(0, self.step_progress),
-            )
+            if incremental:
+                playlist_id_yt, not_found = sync_playlist_to_ytmusic(
+                    playlist_url, yt_name, headers, sleep, self.append_log, csv_path=csv_path, **options
+                )
+            else:
+                # Exporta e importa ao mesmo tempo: o CSV e o armazém de faixas
+                # são gravados conforme as páginas chegam e as buscas começam
+                # já na primeira página.
+                store = TrackStore(track_store_path(csv_name))
+                try:
+                    rows = stream_spotify_playlist(
+                        playlist_url, self.append_log, csv_path, metrics=options["metrics"], store=store
+                    )
+                    playlist_id_yt, not_found = import_tracks_to_ytmusic(
+                        rows=rows,
+                        new_playlist_name=yt_name,
+                        headers_file=headers,
+                        sleep_seconds=sleep,
+                        log=self.append_log,
+                        track_store=store,
+                        **options,
+                    )
+                finally:
+                    store.close()
             fallback_file = salvar_fallback_not_found(not_found, csv_name, self.append_log)
 
             # Atualiza estado
@@ -752,7 +4154,8 @@ class SpotifyYtMusicApp:
         yt_name = base_name
         headers = self.headers_file.get()
         sleep = float(self.sleep_seconds.get())
-        dedup = bool(self.dedup_var.get())
+        incremental = bool(self.incremental_var.get())
+        options = self._import_options(base_name)
 
         def job():
             self.root.after(0, lambda: self.start_animation("Migrando curtidas..."))
@@ -763,18 +4166,25 @@ class SpotifyYtMusicApp:
             self.append_log(f"CSV: {csv_path}")
             self.append_log(f"Playlist YT: {yt_name}")
 
-            export_liked_songs_to_csv(csv_path, self.append_log)
-
-            playlist_id_yt, not_found = import_csv_to_ytmusic(
-                csv_path=csv_path,
-                new_playlist_name=yt_name,
-                headers_file=headers,
-                sleep_seconds=sleep,
-                log=self.append_log,
-                dedup=dedup,
-                on_progress_init=lambda total: self.root.after(0, lambda: self.reset_progress(total)),
-                on_progress_step=lambda: self.root.after(0, self.step_progress),
-            )
+            if incremental:
+                playlist_id_yt, not_found = sync_liked_to_ytmusic(
+                    yt_name, headers, sleep, self.append_log, csv_path=csv_path, **options
+                )
+            else:
+                store = TrackStore(track_store_path(base_name))
+                try:
+                    rows = stream_liked_songs(self.append_log, csv_path, metrics=options["metrics"], store=store)
+                    playlist_id_yt, not_found = import_tracks_to_ytmusic(
+                        rows=rows,
+                        new_playlist_name=yt_name,
+                        headers_file=headers,
+                        sleep_seconds=sleep,
+                        log=self.append_log,
+                        track_store=store,
+                        **options,
+                    )
+                finally:
+                    store.close()
             fallback_file = salvar_fallback_not_found(not_found, base_name, self.append_log)
 
             self.last_playlist_id = playlist_id_yt
@@ -792,39 +4202,61 @@ class SpotifyYtMusicApp:
             txt = "(nenhuma ainda)"
         self.last_playlist_label.configure(text=txt)
 
+    def _manual_search_query(self, query: str):
+        # Roda na thread do DebouncedSearch: cache de buscas primeiro.
+        cache = get_search_cache()
+        key = SearchCache.make_key(query)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached[1]
+        results = get_ytmusic(self._manual_headers).search(query, filter="songs")
+        cache.put(key, results, top_n=MANUAL_SEARCH_RESULTS)
+        return results[:MANUAL_SEARCH_RESULTS]
+
+    def _on_manual_query_changed(self):
+        """Busca enquanto digita: só depois de uma pausa, e só a última consulta vale."""
+        query = self.manual_query_var.get().strip()
+        headers = self.headers_file.get()
+        if len(query) < MANUAL_SEARCH_MIN_CHARS or not os.path.exists(headers):
+            self.manual_search.cancel()
+            return
+        self._manual_headers = headers
+        self.manual_search.submit(query)
+
+    def _show_manual_results(self, generation: int, query: str, results):
+        if not self.manual_search.is_current(generation):
+            return  # o usuário já digitou outra coisa
+        self.manual_results = list(results)
+        self.results_list.delete(0, "end")
+        for item in self.manual_results:
+            title = item.get("title", "Sem título")
+            artists = ", ".join([a["name"] for a in item.get("artists", [])]) or "Artista desconhecido"
+            album = (item.get("album") or {}).get("name", "")
+            display = f"{title} - {artists} ({album})"
+            self.results_list.insert("end", display)
+        if generation == self._manual_logged_generation:
+            self.append_log(f"Encontrados {len(self.manual_results)} resultados para busca manual.")
+        else:
+            self.status_text.set(f"{len(self.manual_results)} resultado(s) para '{query}'.")
+
+    def _show_manual_error(self, query: str, error):
+        self.append_log(f"  ⚠️ Erro na busca manual '{query}': {error}")
+        self.status_text.set("Erro na busca manual.")
+
     def on_manual_search(self):
         query = self.manual_query_var.get().strip()
         if not query:
             messagebox.showwarning("Atenção", "Digite um termo de busca (artista + música).")
             return
 
-        if not self.last_playlist_id:
-            messagebox.showwarning("Atenção", "Nenhuma playlist criada ainda nesta sessão.")
-            return
-
         headers = self.headers_file.get()
         if not os.path.exists(headers):
             messagebox.showerror("Erro", f"Arquivo de headers '{headers}' não encontrado.")
             return
 
-        def job():
-            self.append_log(f"\n🔎 Busca manual: {query}")
-            yt = YTMusic(headers)
-            results = yt.search(query, filter="songs")
-
-            def update_list():
-                self.results_list.delete(0, "end")
-                for item in results[:20]:
-                    title = item.get("title", "Sem título")
-                    artists = ", ".join([a["name"] for a in item.get("artists", [])]) or "Artista desconhecido"
-                    album = item.get("album", {}).get("name", "")
-                    display = f"{title} - {artists} ({album})"
-                    self.results_list.insert("end", display)
-                self.append_log(f"Encontrados {len(results)} resultados para busca manual.")
-
-            self.root.after(0, update_list)
-
-        self._run_in_thread(job)
+        self.append_log(f"\n🔎 Busca manual: {query}")
+        self._manual_headers = headers
+        self._manual_logged_generation = self.manual_search.submit(query, delay=0)
 
     def on_manual_add_selected(self):
         sel = self.results_list.curselection()
@@ -833,7 +4265,11 @@ class SpotifyYtMusicApp:
             return
 
         idx = sel[0]
-        query = self.manual_query_var.get().strip()
+        if idx >= len(self.manual_results):
+            self.append_log("Nenhum resultado disponível para adicionar.")
+            return
+        # o item exibido na lista, não uma nova busca (que poderia ter mudado)
+        item = self.manual_results[idx]
 
         headers = self.headers_file.get()
         if not os.path.exists(headers):
@@ -844,16 +4280,11 @@ class SpotifyYtMusicApp:
             messagebox.showwarning("Atenção", "Nenhuma playlist criada ainda nesta sessão.")
             return
 
-        def job():
-            yt = YTMusic(headers)
-            results = yt.search(query, filter="songs")
-            if not results or idx >= len(results):
-                self.append_log("Nenhum resultado disponível para adicionar.")
-                return
+        playlist_id = self.last_playlist_id
 
-            item = results[idx]
-            video_id = item["videoId"]
-            yt.add_playlist_items(self.last_playlist_id, [video_id])
+        def job():
+            yt = get_ytmusic(headers)
+            yt.add_playlist_items(playlist_id, [item["videoId"]])
 
             title = item.get("title", "Sem título")
             artists = ", ".join([a["name"] for a in item.get("artists", [])]) or "Artista desconhecido"
@@ -871,11 +4302,36 @@ class SpotifyYtMusicApp:
             messagebox.showinfo("Info", "Nenhum arquivo _not_found disponível nesta sessão.")
 
 
-def main():
+def _import_tk():
+    """Carrega o Tkinter nos nomes globais usados pela GUI."""
+    global tk, ttk, messagebox, filedialog
+    import tkinter as tk
+    from tkinter import ttk, messagebox, filedialog
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    # --startup-timing: relatório dos tempos de inicialização no stderr
+    startup_timing = "--startup-timing" in argv
+    argv = [a for a in argv if a != "--startup-timing"]
+    ensure_csv_dir()
+    if argv:
+        code = cli_main(argv)
+        if startup_timing:
+            print(STARTUP.report(), file=sys.stderr)
+        return code
+
+    _import_tk()
+    STARTUP.mark("tkinter carregado")
     root = tk.Tk()
-    app = SpotifyYtMusicApp(root)
+    app = SpotifyYtMusicApp(root, startup_timing=startup_timing)
+    STARTUP.mark("janela montada")
     root.mainloop()
+    return 0
+
+
+STARTUP.mark("módulo carregado")
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())